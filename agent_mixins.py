@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Composition of browser_use Agent classes with feature mixins.
+
+Checkpointing, bounded history and profiling each add behaviour to the
+Agent by overriding its methods in a mixin. cli.py stacks the mixins it
+needs on top of the Agent class; with_mixin creates each combination once,
+so repeated runs in one process share their classes.
+"""
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def with_mixin(mixin: type, agent_class: type, prefix: str) -> type:
+    """
+    Return the subclass of agent_class with mixin in front of it, named
+    prefix + agent_class.__name__.
+    """
+    return type(f"{prefix}{agent_class.__name__}", (mixin, agent_class), {})
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark for run_research.
+
+Serves fixture sites from a local HTTP server and drives run_research with a
+scripted chat model, so runs are repeatable and need neither network access
+nor an LLM API key. Every scenario runs the same tasks at each concurrency
+level, and the report covers:
+
+- CLI startup (`cli.py --help` wall time)
+- browser startup per task (run start to first agent step)
+- per-step overhead (step time not spent in the LLM)
+- p50/p95 task latency and tasks per minute
+- peak RSS of this process and its browsers (needs psutil)
+- prompt tokens per agent step (estimated from the text sent to the model)
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --scenarios baseline no-stealth --concurrency 1 4
+    python benchmark.py --output new.json --baseline bench.json
+    python benchmark.py --startup-budget-ms 300
+    python benchmark.py --scenarios baseline compact-state --llm-ms-per-1k-tokens 200
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from typing import List, Optional
+
+# Keep the benchmark offline: no telemetry from browser_use, and embedded
+# mode stays headless like it does on servers
+os.environ.setdefault('ANONYMIZED_TELEMETRY', 'false')
+os.environ.setdefault('SERVER_ENVIRONMENT', 'true')
+
+from aiohttp import web
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from browser_pool import browser_tree_rss_mb
+from cli import run_research
+from run_events import EventStream
+from state_compaction import estimate_tokens
+
+# run_research options per scenario; baseline is stealth on, headless
+SCENARIOS = {
+    'baseline': {},
+    'no-stealth': {'stealth_mode': False},
+    'headless-new': {'extra_chromium_args': ['--headless=new']},
+    'embedded': {'embedded_browser': True},
+    'compact-state': {'compact_state': True},
+}
+
+ARTICLE_COUNT = 10
+NAV_LINKS = ('Home', 'World', 'Politics', 'Business', 'Science', 'Sport', 'Weather')
+PARAGRAPHS_PER_ARTICLE = 30
+RSS_SAMPLE_INTERVAL_S = 0.2
+
+# Metrics compared against --baseline, and whether higher values are better
+REGRESSION_METRICS = {
+    'p95_task_s': False,
+    'mean_startup_s': False,
+    'mean_step_overhead_s': False,
+    'peak_rss_mb': False,
+    'tasks_per_min': True,
+    'mean_prompt_tokens': False,
+}
+
+# Heavy dependencies cli.py must only import on the code paths that use them
+DEFERRED_MODULES = ('browser_use', 'langchain_core', 'langchain_openai', 'playwright',
+                    'playwright_stealth', 'dotenv')
+
+# 1x1 transparent PNG
+PIXEL_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c4'
+    '890000000b49444154789c6360000200000500017a5eab3f0000000049454e44ae426082'
+)
+
+def fixture_app() -> web.Application:
+    """
+    A small news site: an index linking to articles with text, an image and
+    CSS, and the same nav bar and footer on every page.
+    """
+    nav = ''.join(f'<a href="/">{name}</a> ' for name in NAV_LINKS)
+    footer = '<a href="/">About</a> <a href="/">Contact</a> <a href="/">Privacy</a> <a href="/">Terms</a>'
+
+    def page(title: str, body: str) -> web.Response:
+        return web.Response(content_type='text/html', text=(
+            f'<!DOCTYPE html><html><head><title>{title}</title>'
+            f'<link rel="stylesheet" href="/static/site.css"></head>'
+            f'<body><nav>{nav}</nav><h1>{title}</h1>{body}<footer>{footer}</footer></body></html>'
+        ))
+
+    async def index(request):
+        links = ''.join(
+            f'<li><a href="/article/{n}">Article {n}</a></li>' for n in range(ARTICLE_COUNT)
+        )
+        return page('Fixture News', f'<ul>{links}</ul>')
+
+    async def article(request):
+        n = int(request.match_info['n'])
+        paragraphs = ''.join(
+            f'<p>Article {n}, paragraph {p}: the fixture council met on day {p} '
+            f'and published figures {n * p} and {n + p}.</p>'
+            for p in range(PARAGRAPHS_PER_ARTICLE)
+        )
+        next_link = f'<a href="/article/{(n + 1) % ARTICLE_COUNT}">Next article</a>'
+        return page(f'Article {n}', f'<img src="/static/{n}.png" alt="">{paragraphs}{next_link}')
+
+    async def image(request):
+        return web.Response(body=PIXEL_PNG, content_type='image/png')
+
+    async def stylesheet(request):
+        return web.Response(text='body { font-family: sans-serif; max-width: 40em; }',
+                            content_type='text/css')
+
+    app = web.Application()
+    app.router.add_get('/', index)
+    app.router.add_get('/article/{n}', article)
+    app.router.add_get('/static/site.css', stylesheet)
+    app.router.add_get('/static/{n}.png', image)
+    return app
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that plays a fixed browsing script against the fixture site.
+
+    Each agent step gets the next action: open the index, then open and
+    scroll `pages` articles, then finish. Calls without tools (content
+    extraction) get a canned summary. Each call takes latency_s plus
+    ms_per_1k_tokens for every 1000 prompt tokens, so smaller prompts answer
+    faster like a real model does.
+    """
+    base_url: str
+    task_index: int = 0
+    pages: int = 3
+    latency_s: float = 0.0
+    ms_per_1k_tokens: float = 0.0
+    steps: int = 0
+    prompt_tokens: List[int] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return 'scripted'
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _script(self) -> List[dict]:
+        actions = [{'go_to_url': {'url': f"{self.base_url}/"}}]
+        for page in range(self.pages):
+            n = (self.task_index + page) % ARTICLE_COUNT
+            actions.append({'go_to_url': {'url': f"{self.base_url}/article/{n}"}})
+            actions.append({'scroll_down': {}})
+        actions.append({'done': {'text': f"Read {self.pages} fixture articles", 'success': True}})
+        return actions
+
+    def _respond(self, kwargs: dict) -> ChatResult:
+        tools = kwargs.get('tools')
+        if not tools:
+            message = AIMessage(content='The page lists fixture council figures.')
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        script = self._script()
+        action = script[min(self.steps, len(script) - 1)]
+        self.steps += 1
+        message = AIMessage(content='', tool_calls=[{
+            'name': tools[0]['function']['name'],
+            'args': {
+                'current_state': {
+                    'page_summary': '',
+                    'evaluation_previous_goal': 'Success',
+                    'memory': f"Step {self.steps} of {len(script)}",
+                    'next_goal': next(iter(action))
+                },
+                'action': [action]
+            },
+            'id': f"call_{self.steps}"
+        }])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _delay(self, messages, kwargs: dict) -> float:
+        tokens = estimate_tokens(messages)
+        if kwargs.get('tools'):
+            self.prompt_tokens.append(tokens)
+        return self.latency_s + tokens / 1000 * self.ms_per_1k_tokens / 1000
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._delay(messages, kwargs))
+        return self._respond(kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._delay(messages, kwargs))
+        return self._respond(kwargs)
+
+class CollectedEvents(EventStream):
+    """
+    Keeps run events in memory instead of writing them out.
+    """
+    def __init__(self):
+        super().__init__(out=io.StringIO())
+        self.records: List[dict] = []
+
+    def emit(self, event: str, **fields):
+        self.records.append({'event': event, 'ts': time.time(), **fields})
+
+def process_tree_rss_mb() -> Optional[float]:
+    children = browser_tree_rss_mb()
+    if children is None:
+        return None
+    import psutil
+    return children + psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """
+    Nearest-rank percentile.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * fraction))
+    return ordered[rank - 1]
+
+def mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+def measure_cli_startup(repeats: int = 3) -> float:
+    """
+    Median wall time of `cli.py --help`.
+    """
+    cli_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, cli_path, '--help'], stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        times.append(time.perf_counter() - started)
+    return sorted(times)[len(times) // 2]
+
+def modules_loaded_by_cli_import() -> List[str]:
+    """
+    DEFERRED_MODULES that a fresh `import cli` loads.
+    """
+    code = (f"import json, sys, cli; "
+            f"print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(output)
+
+def check_startup(budget_ms: float) -> List[str]:
+    """
+    Describe every way CLI startup breaks its budget.
+    """
+    problems = []
+    help_ms = measure_cli_startup(repeats=5) * 1000
+    print(f"cli.py --help: {help_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    if help_ms > budget_ms:
+        problems.append(f"cli.py --help took {help_ms:.0f} ms, over the {budget_ms:.0f} ms budget")
+    loaded = modules_loaded_by_cli_import()
+    if loaded:
+        problems.append(f"import cli loads {', '.join(loaded)}; import them where they are used")
+    return problems
+
+async def run_task(base_url: str, index: int, options: dict, args) -> dict:
+    """
+    Run one scripted research task and return its timings.
+    """
+    events = CollectedEvents()
+    llm = ScriptedChatModel(base_url=base_url, task_index=index, pages=args.pages,
+                            latency_s=args.llm_latency_ms / 1000,
+                            ms_per_1k_tokens=args.llm_ms_per_1k_tokens)
+    started = time.perf_counter()
+    try:
+        await run_research(f"Read {args.pages} fixture articles starting at {index}",
+                           events=events, llm=llm, **options)
+    except Exception as e:
+        return {'status': 'error', 'error': str(e), 'duration_s': time.perf_counter() - started}
+
+    start = next(e for e in events.records if e['event'] == 'start')
+    end = next(e for e in events.records if e['event'] == 'end')
+    steps = [e for e in events.records if e['event'] == 'step']
+    startup_s = None
+    if steps:
+        startup_s = steps[0]['ts'] - steps[0]['duration_s'] - start['ts']
+    return {
+        'status': end['status'],
+        'duration_s': time.perf_counter() - started,
+        'startup_s': startup_s,
+        'steps': len(steps),
+        'step_overheads_s': [s['duration_s'] - (s['llm_s'] or 0.0) for s in steps],
+        'prompt_tokens': llm.prompt_tokens
+    }
+
+async def run_level(base_url: str, options: dict, concurrency: int, args) -> dict:
+    """
+    Run args.tasks tasks at most `concurrency` at a time.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    peak_rss = None
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            rss = process_tree_rss_mb()
+            if rss is not None:
+                peak_rss = max(peak_rss or 0.0, rss)
+            await asyncio.sleep(RSS_SAMPLE_INTERVAL_S)
+
+    async def limited(index: int) -> dict:
+        async with semaphore:
+            return await run_task(base_url, index, options, args)
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    try:
+        tasks = await asyncio.gather(*(limited(i) for i in range(args.tasks)))
+    finally:
+        sampler.cancel()
+    wall_s = time.perf_counter() - started
+
+    ok = [t for t in tasks if t['status'] == 'ok']
+    latencies = [t['duration_s'] for t in ok]
+    overheads = [o for t in ok for o in t['step_overheads_s']]
+    startups = [t['startup_s'] for t in ok if t['startup_s'] is not None]
+    return {
+        'concurrency': concurrency,
+        'tasks': len(tasks),
+        'failed': len(tasks) - len(ok),
+        'errors': sorted({t['error'] for t in tasks if t.get('error')}),
+        'wall_s': round(wall_s, 3),
+        'tasks_per_min': round(len(ok) / wall_s * 60, 2) if wall_s else None,
+        'p50_task_s': percentile(latencies, 0.5),
+        'p95_task_s': percentile(latencies, 0.95),
+        'mean_startup_s': mean(startups),
+        'mean_step_overhead_s': mean(overheads),
+        'p95_step_overhead_s': percentile(overheads, 0.95),
+        'steps_per_task': mean([t['steps'] for t in ok]),
+        'mean_prompt_tokens': mean([n for t in ok for n in t['prompt_tokens']]),
+        'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run_benchmark(args) -> dict:
+    runner = web.AppRunner(fixture_app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    base_url = f"http://127.0.0.1:{port}"
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'tasks': args.tasks,
+            'pages': args.pages,
+            'llm_latency_ms': args.llm_latency_ms,
+            'llm_ms_per_1k_tokens': args.llm_ms_per_1k_tokens,
+            'concurrency': args.concurrency
+        },
+        'cli_help_s': round(measure_cli_startup(), 3),
+        'scenarios': {}
+    }
+    try:
+        for name in args.scenarios:
+            levels = {}
+            for concurrency in args.concurrency:
+                print(f"{name} @ concurrency {concurrency}...", file=sys.stderr)
+                if args.verbose:
+                    result = await run_level(base_url, SCENARIOS[name], concurrency, args)
+                else:
+                    with redirect_stdout(io.StringIO()):
+                        result = await run_level(base_url, SCENARIOS[name], concurrency, args)
+                levels[str(concurrency)] = result
+            report['scenarios'][name] = {'options': SCENARIOS[name], 'levels': levels}
+    finally:
+        await runner.cleanup()
+    return report
+
+def find_regressions(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Describe every metric that got worse than the baseline by more than tolerance.
+    """
+    regressions = []
+    for name, scenario in report['scenarios'].items():
+        base_levels = baseline.get('scenarios', {}).get(name, {}).get('levels', {})
+        for level, result in scenario['levels'].items():
+            base = base_levels.get(level)
+            if base is None:
+                continue
+            for metric, higher_is_better in REGRESSION_METRICS.items():
+                new, old = result.get(metric), base.get(metric)
+                if not new or not old:
+                    continue
+                change = (old - new) / old if higher_is_better else (new - old) / old
+                if change > tolerance:
+                    regressions.append(
+                        f"{name} @ {level}: {metric} {old:.3f} -> {new:.3f} ({change:.0%} worse)"
+                    )
+    return regressions
+
+def print_report(report: dict):
+    print(f"cli.py --help: {report['cli_help_s']:.3f}s")
+    header = f"{'scenario':<14}{'conc':>5}{'tasks/min':>11}{'p50 s':>8}{'p95 s':>8}" \
+             f"{'startup s':>11}{'step ovh s':>12}{'tokens':>8}{'peak MB':>9}{'failed':>8}"
+    print(header)
+
+    def fmt(value, width, digits=2):
+        return f"{'-':>{width}}" if value is None else f"{value:>{width}.{digits}f}"
+
+    for name, scenario in report['scenarios'].items():
+        for level, r in scenario['levels'].items():
+            print(f"{name:<14}{level:>5}{fmt(r['tasks_per_min'], 11)}{fmt(r['p50_task_s'], 8)}"
+                  f"{fmt(r['p95_task_s'], 8)}{fmt(r['mean_startup_s'], 11)}"
+                  f"{fmt(r['mean_step_overhead_s'], 12, 3)}{fmt(r.get('mean_prompt_tokens'), 8, 0)}"
+                  f"{fmt(r['peak_rss_mb'], 9, 0)}{r['failed']:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark for run_research')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help='Scenarios to run (default: all)')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 2, 4],
+                        help='Concurrency levels to run each scenario at (default: 1 2 4)')
+    parser.add_argument('--tasks', type=int, default=4,
+                        help='Tasks per scenario and concurrency level (default: 4)')
+    parser.add_argument('--pages', type=int, default=3,
+                        help='Fixture articles each task opens (default: 3)')
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0,
+                        help='Simulated latency of every LLM call (default: 0)')
+    parser.add_argument('--llm-ms-per-1k-tokens', type=float, default=0.0,
+                        help='Simulated extra LLM latency per 1000 prompt tokens (default: 0)')
+    parser.add_argument('--output', type=str,
+                        help='Write the JSON report to this file')
+    parser.add_argument('--baseline', type=str,
+                        help='JSON report to compare against; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Relative change counted as a regression (default: 0.2)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Show run_research output')
+    parser.add_argument('--startup-budget-ms', type=float, metavar='MS',
+                        help='Only check CLI startup: exit 1 if cli.py --help takes longer than MS '
+                             'or importing cli loads heavy dependencies')
+    args = parser.parse_args()
+
+    if args.startup_budget_ms is not None:
+        problems = check_startup(args.startup_budget_ms)
+        for problem in problems:
+            print(f"STARTUP {problem}")
+        if problems:
+            raise SystemExit(1)
+        return
+
+    if args.tasks < 1 or args.pages < 1 or any(c < 1 for c in args.concurrency):
+        parser.error("--tasks, --pages and --concurrency must be at least 1")
+
+    if not args.verbose:
+        logging.getLogger('browser_use').setLevel(logging.WARNING)
+
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Warm browser pool for run_research.
+
+Keeps a fixed number of launched browsers, each with a pre-created browser
+context, so research tasks lease a ready browser instead of paying the full
+Chromium cold start (plus stealth setup) on every call.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from browser_use.browser.browser import Browser, BrowserConfig
+
+from cli import create_browser
+
+def browser_tree_rss_mb() -> Optional[float]:
+    """
+    Return the resident memory of every process started by this one, in MB.
+
+    Chromium runs as children of the Playwright driver, which is a child of
+    this process, so this covers every pooled browser. Returns None when
+    psutil is not available.
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    total = 0
+    for child in psutil.Process(os.getpid()).children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total / (1024 * 1024)
+
+class BrowserLease:
+    """
+    A launched browser plus a ready browser context, handed out by BrowserPool.
+
+    Pass it to run_research(lease=...) or use `lease.browser` and
+    `lease.context` directly. Leases are returned to the pool by the
+    `BrowserPool.lease()` context manager.
+    """
+    def __init__(self, slot_id: int, browser: Browser):
+        self.slot_id = slot_id
+        self.browser = browser
+        self.context = None
+        self.tasks_run = 0
+
+    def is_healthy(self) -> bool:
+        """
+        Check that the underlying Playwright browser is still connected.
+        """
+        playwright_browser = getattr(self.browser, 'playwright_browser', None)
+        return playwright_browser is not None and playwright_browser.is_connected()
+
+class BrowserPool:
+    """
+    Pool of warm browsers with lease/return semantics.
+
+    Each browser is leased to one task at a time. When a lease is returned its
+    context is closed and a fresh one is pre-created in the background; the
+    browser itself is relaunched when it fails a health check, has run
+    `max_tasks_per_browser` tasks, or the browsers' combined RSS exceeds
+    `max_rss_mb`.
+
+    Usage:
+        async with BrowserPool(config, size=2) as pool:
+            async with pool.lease() as lease:
+                await run_research(prompt, lease=lease)
+    """
+    def __init__(
+        self,
+        config: BrowserConfig,
+        size: int = 2,
+        stealth_mode: bool = True,
+        max_tasks_per_browser: int = 50,
+        max_rss_mb: Optional[float] = None,
+        **browser_kwargs
+    ):
+        """
+        Args:
+            config: Browser configuration used for every pooled browser
+            size: Number of browsers to keep launched
+            stealth_mode: Whether pooled browsers apply stealth mode
+            max_tasks_per_browser: Recycle a browser after this many tasks
+            max_rss_mb: Recycle a returning browser when the combined RSS of
+                all pooled browsers exceeds this many MB (requires psutil)
+            **browser_kwargs: Extra create_browser arguments, e.g. network_profile
+        """
+        if size < 1:
+            raise ValueError("BrowserPool size must be at least 1")
+        self.config = config
+        self.size = size
+        self.stealth_mode = stealth_mode
+        self.max_tasks_per_browser = max_tasks_per_browser
+        self.max_rss_mb = max_rss_mb
+        self.browser_kwargs = browser_kwargs
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots: List[BrowserLease] = []
+        self._refresh_tasks = set()
+        self._closed = False
+
+        if max_rss_mb is not None and browser_tree_rss_mb() is None:
+            print("psutil is not installed; the max-RSS recycle policy is disabled")
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        """
+        Launch every browser and pre-create its first context.
+        """
+        slots = await asyncio.gather(*(self._launch(i) for i in range(self.size)))
+        for slot in slots:
+            self._slots.append(slot)
+            self._idle.put_nowait(slot)
+        print(f"Browser pool ready with {self.size} warm browser(s)")
+
+    async def _launch(self, slot_id: int) -> BrowserLease:
+        """
+        Launch one browser and warm a context on it.
+        """
+        slot = BrowserLease(slot_id, create_browser(
+            self.config, stealth_mode=self.stealth_mode, **self.browser_kwargs
+        ))
+        await slot.browser.get_playwright_browser()
+        await self._new_context(slot)
+        return slot
+
+    async def _new_context(self, slot: BrowserLease):
+        """
+        Create a fresh context for the slot and open its first page.
+        """
+        slot.context = await slot.browser.new_context()
+        await slot.context.get_session()
+
+    async def _recycle(self, slot: BrowserLease, reason: str) -> BrowserLease:
+        """
+        Close a slot's browser and launch a replacement in its place.
+        """
+        print(f"Recycling pooled browser {slot.slot_id}: {reason}")
+        try:
+            await slot.browser.close()
+        except Exception as e:
+            print(f"Error closing pooled browser {slot.slot_id}: {e}")
+        replacement = await self._launch(slot.slot_id)
+        self._slots[self._slots.index(slot)] = replacement
+        return replacement
+
+    async def acquire(self) -> BrowserLease:
+        """
+        Wait for an idle browser and return it with a ready context.
+        """
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+        slot = await self._idle.get()
+        try:
+            if not slot.is_healthy():
+                slot = await self._recycle(slot, "failed health check")
+            elif slot.context is None:
+                await self._new_context(slot)
+        except Exception:
+            # Keep the pool at full size; the next acquire retries the slot
+            self._idle.put_nowait(slot)
+            raise
+        return slot
+
+    def release(self, slot: BrowserLease):
+        """
+        Return a leased browser; its context is replaced in the background.
+        """
+        slot.tasks_run += 1
+        task = asyncio.create_task(self._refresh(slot))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, slot: BrowserLease):
+        """
+        Close the used context, apply the recycle policy and requeue the slot.
+        """
+        try:
+            if slot.context is not None:
+                await slot.context.close()
+                slot.context = None
+
+            rss_mb = browser_tree_rss_mb() if self.max_rss_mb is not None else None
+            if not slot.is_healthy():
+                slot = await self._recycle(slot, "failed health check")
+            elif self.max_tasks_per_browser and slot.tasks_run >= self.max_tasks_per_browser:
+                slot = await self._recycle(slot, f"ran {slot.tasks_run} tasks")
+            elif rss_mb is not None and rss_mb > self.max_rss_mb:
+                slot = await self._recycle(slot, f"pool RSS {rss_mb:.0f} MB over {self.max_rss_mb:.0f} MB")
+            else:
+                await self._new_context(slot)
+        except Exception as e:
+            # Requeue anyway; acquire() recycles the browser if it is unhealthy
+            print(f"Error refreshing pooled browser {slot.slot_id}: {e}")
+
+        self._idle.put_nowait(slot)
+
+    @asynccontextmanager
+    async def lease(self):
+        """
+        Lease a warm browser for the duration of the `async with` block.
+        """
+        slot = await self.acquire()
+        try:
+            yield slot
+        finally:
+            self.release(slot)
+
+    async def close(self):
+        """
+        Close every pooled browser.
+        """
+        self._closed = True
+        if self._refresh_tasks:
+            await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+        for slot in self._slots:
+            try:
+                await slot.browser.close()
+            except Exception as e:
+                print(f"Error closing pooled browser {slot.slot_id}: {e}")
+        self._slots.clear()
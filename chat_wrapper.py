@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Base class for chat models that hand their calls on to other chat models.
+
+The LLM cache, the model router and state compaction each wrap the model
+the Agent talks to. Tools are bound on the wrapper, but only the wrapped
+model knows its provider's tool format, so the wrapper asks that model to
+format them and binds the result to itself.
+"""
+from langchain_core.language_models.chat_models import BaseChatModel
+
+class ChatModelWrapper(BaseChatModel):
+    """
+    Chat model that formats bound tools like `tool_model` does.
+    """
+    @property
+    def tool_model(self) -> BaseChatModel:
+        """
+        The wrapped model whose provider receives the tools; `inner` by default.
+        """
+        return self.inner
+
+    def bind_tools(self, tools, **kwargs):
+        bound = self.tool_model.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Step-level checkpoints for research runs.
+
+After every agent step, RunCheckpoint writes a compact JSON file with the
+task, a per-step summary of the history (model output, extracted content,
+errors, URL), the open tab URLs and the context's cookies. Screenshots and
+DOM state are left out. A run that crashes, is interrupted or loses its
+browser can be resumed with `cli.py --resume <run-id>`: the cookies and tabs
+are restored and a new agent continues the task, told what the earlier
+steps did and found.
+
+Checkpoints hold cookies, so they are written with owner-only permissions
+and deleted once the run succeeds.
+"""
+import json
+import os
+import time
+from typing import List, Optional
+
+from agent_mixins import with_mixin
+
+DEFAULT_CHECKPOINT_DIR = './Checkpoints'
+
+# Extracted content repeated in the resumed task, per step and in total
+RESUME_CONTENT_CHARS = 2000
+RESUME_TOTAL_CHARS = 12000
+
+def _compact_step(item) -> dict:
+    """
+    The parts of an AgentHistory item worth keeping: no screenshot or DOM.
+    """
+    model_output = getattr(item, 'model_output', None)
+    state = getattr(item, 'state', None)
+    return {
+        'model_output': model_output.model_dump(exclude_none=True) if model_output is not None else None,
+        'results': [
+            {'extracted_content': r.extracted_content, 'error': r.error, 'is_done': r.is_done}
+            for r in (getattr(item, 'result', None) or [])
+        ],
+        'url': getattr(state, 'url', None),
+        'title': getattr(state, 'title', None)
+    }
+
+class RunCheckpoint:
+    """
+    The checkpoint file of one research run.
+    """
+    def __init__(self, path: str, run_id: str, task: str, steps: Optional[List[dict]] = None,
+                 urls: Optional[List[str]] = None, current_url: Optional[str] = None,
+                 cookies: Optional[List[dict]] = None):
+        self.path = path
+        self.run_id = run_id
+        self.task = task
+        self.steps = steps or []
+        self.urls = urls or []
+        self.current_url = current_url
+        self.cookies = cookies or []
+        # Steps from before this process resumed the run
+        self.prior_steps = list(self.steps)
+
+    @staticmethod
+    def path_for(checkpoint_dir: str, run_id: str) -> str:
+        if not run_id or os.path.basename(run_id) != run_id or run_id.startswith('.'):
+            raise ValueError(f"Invalid run id: {run_id!r}")
+        return os.path.join(checkpoint_dir, f"{run_id}.json")
+
+    @classmethod
+    def create(cls, checkpoint_dir: str, run_id: str, task: str) -> 'RunCheckpoint':
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        return cls(cls.path_for(checkpoint_dir, run_id), run_id, task)
+
+    @classmethod
+    def load(cls, checkpoint_dir: str, run_id: str) -> 'RunCheckpoint':
+        path = cls.path_for(checkpoint_dir, run_id)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"No checkpoint for run {run_id} in {checkpoint_dir}") from None
+        return cls(path, run_id, data['task'], data.get('steps'), data.get('urls'),
+                   data.get('current_url'), data.get('cookies'))
+
+    @property
+    def completed_steps(self) -> int:
+        return len(self.steps)
+
+    def save(self):
+        """
+        Write the checkpoint atomically, readable by the owner only.
+        """
+        payload = json.dumps({
+            'run_id': self.run_id,
+            'task': self.task,
+            'updated_at': time.time(),
+            'steps': self.steps,
+            'urls': self.urls,
+            'current_url': self.current_url,
+            'cookies': self.cookies
+        }, default=str)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, self.path)
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def capture(self, agent):
+        """
+        Record the agent's history and its browser context's tabs and cookies.
+        """
+        self.steps = self.prior_steps + [_compact_step(item) for item in agent.history.history]
+        session = await agent.browser_context.get_session()
+        self.urls = [page.url for page in session.context.pages]
+        self.current_url = (await agent.browser_context.get_current_page()).url
+        self.cookies = await session.context.cookies()
+        self.save()
+
+    async def restore(self, browser_context):
+        """
+        Put the cookies back and reopen the tabs, with the current one last.
+        """
+        session = await browser_context.get_session()
+        context = session.context
+        if self.cookies:
+            await context.add_cookies(self.cookies)
+
+        urls = [url for url in self.urls if url != self.current_url]
+        if self.current_url:
+            urls.append(self.current_url)
+        urls = [url for url in urls if url.startswith(('http://', 'https://'))]
+        for index, url in enumerate(urls):
+            page = context.pages[0] if index == 0 and context.pages else await context.new_page()
+            try:
+                await page.goto(url)
+            except Exception as e:
+                print(f"Could not reopen {url}: {e}")
+
+    def resume_task(self) -> str:
+        """
+        The task for the agent that continues the run, with what the earlier
+        steps did and extracted.
+        """
+        lines = [self.task, '', f"This task was interrupted after {self.completed_steps} step(s) "
+                 "and is being resumed; the browser is back on the pages it had open. Progress so far:"]
+        budget = RESUME_TOTAL_CHARS
+        for number, step in enumerate(self.steps, start=1):
+            state = (step.get('model_output') or {}).get('current_state') or {}
+            goal = state.get('next_goal') or state.get('memory') or ''
+            lines.append(f"- Step {number} ({step.get('url') or 'no page'}): {goal}".rstrip(': '))
+            for result in step['results']:
+                content = result.get('extracted_content')
+                if content and budget > 0:
+                    content = content[:min(RESUME_CONTENT_CHARS, budget)]
+                    budget -= len(content)
+                    lines.append(f"  Extracted: {content}")
+        lines.append('Continue from here without repeating completed steps.')
+        return '\n'.join(lines)
+
+class CheckpointMixin:
+    """
+    Agent mixin that captures `checkpoint` after every step.
+    """
+    checkpoint: RunCheckpoint
+
+    async def step(self, *args, **kwargs):
+        try:
+            return await super().step(*args, **kwargs)
+        finally:
+            try:
+                await self.checkpoint.capture(self)
+            except Exception as e:
+                print(f"Could not write checkpoint {self.checkpoint.path}: {e}")
+
+def checkpointing(agent_class):
+    """
+    Return a subclass of agent_class with CheckpointMixin.
+    """
+    return with_mixin(CheckpointMixin, agent_class, 'Checkpointing')
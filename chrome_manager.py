@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Chrome process lifecycle manager.
+
+Gives each run its own remote debugging port and profile directory under
+./ChromeUserData, waits for Chrome to answer on /json/version instead of
+sleeping a fixed time, reuses an idle instance launched by an earlier run when
+one fits, and reaps instances whose owners are gone.
+
+Each instance lives in ./ChromeUserData/port-<port>/ with an instance.json
+describing the process (PID, start time and launch arguments) and a lock file
+that the run using it holds an OS file lock on. The OS drops that lock when
+the run exits, so a crashed run never leaves the instance locked. A PID is
+only taken to be the instance's Chrome when the process also has the
+recorded start time, since PIDs are reused after Chrome exits or a reboot.
+
+psutil is imported only when an instance is managed, so importing this
+module (as cli.py does) works without it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import time
+import urllib.request
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+DEFAULT_BASE_DIR = './ChromeUserData'
+INSTANCE_FILE = 'instance.json'
+LOCK_FILE = 'lock'
+
+# A process is the recorded one when its start time is within this of the record
+CREATE_TIME_TOLERANCE_S = 1.0
+
+def find_free_port() -> int:
+    """
+    Ask the OS for a free TCP port on localhost.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def parse_debugging_port(chromium_args: List[str]) -> Optional[int]:
+    """
+    Return the port of a --remote-debugging-port=<port> argument, if any.
+    """
+    for arg in chromium_args or []:
+        if arg.startswith('--remote-debugging-port='):
+            try:
+                return int(arg.split('=', 1)[1])
+            except ValueError:
+                return None
+    return None
+
+def process_create_time(pid: int) -> Optional[float]:
+    """
+    Return when process pid started (seconds since the epoch), or None.
+    """
+    import psutil
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+
+def is_process_alive(pid: Optional[int], create_time: Optional[float] = None) -> bool:
+    """
+    Whether pid is running and, when create_time is given, started then.
+    """
+    import psutil
+    if not pid:
+        return False
+    try:
+        process = psutil.Process(pid)
+        if process.status() == psutil.STATUS_ZOMBIE:
+            return False
+        return create_time is None or abs(process.create_time() - create_time) <= CREATE_TIME_TOLERANCE_S
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+def terminate_process_tree(pid: int, timeout: float = 5.0, create_time: Optional[float] = None):
+    """
+    Terminate a process and its children, killing whatever outlives `timeout`.
+
+    With create_time, nothing is terminated unless pid started then.
+    """
+    import psutil
+    if create_time is not None and not is_process_alive(pid, create_time):
+        return
+    try:
+        parent = psutil.Process(pid)
+    except psutil.NoSuchProcess:
+        return
+    processes = parent.children(recursive=True) + [parent]
+    for process in processes:
+        try:
+            process.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    _, alive = psutil.wait_procs(processes, timeout=timeout)
+    for process in alive:
+        try:
+            process.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+def _fetch_devtools_version(host: str, port: int, timeout: float) -> dict:
+    with urllib.request.urlopen(f"http://{host}:{port}/json/version", timeout=timeout) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+def _lock_fd(fd: int):
+    """
+    Take a non-blocking exclusive lock on fd; raises OSError when it is held.
+    """
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+def _normalized_args(extra_args: Optional[List[str]]) -> List[str]:
+    """
+    Launch arguments that set up an instance, in a comparable form.
+    """
+    return sorted(arg for arg in (extra_args or []) if not arg.startswith('--remote-debugging-port'))
+
+async def wait_for_devtools(
+    port: int,
+    timeout: float = 15.0,
+    host: str = '127.0.0.1'
+) -> dict:
+    """
+    Poll /json/version with exponential backoff until Chrome answers.
+
+    Returns the parsed /json/version payload, or raises TimeoutError.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = 0.05
+    while True:
+        try:
+            return await loop.run_in_executor(None, _fetch_devtools_version, host, port, 1.0)
+        except (OSError, ValueError):
+            if loop.time() + delay > deadline:
+                raise TimeoutError(f"Chrome did not answer on port {port} within {timeout:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+class ChromeInstance:
+    """
+    A Chrome process listening for DevTools connections on `port`.
+
+    `pid` is None for instances that were already running and not started by
+    a ChromeManager; those are never terminated by it.
+    """
+    def __init__(self, port: int, profile_dir: Optional[str] = None, pid: Optional[int] = None,
+                 chrome_path: Optional[str] = None, ws_url: Optional[str] = None):
+        self.port = port
+        self.profile_dir = profile_dir
+        self.pid = pid
+        self.chrome_path = chrome_path
+        self.ws_url = ws_url
+
+    @property
+    def cdp_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+class ChromeManager:
+    """
+    Launches, reuses and reaps Chrome instances under one base directory.
+    """
+    def __init__(self, base_dir: str = DEFAULT_BASE_DIR, max_idle_s: float = 1800.0):
+        """
+        Args:
+            base_dir: Directory holding one profile directory per instance
+            max_idle_s: Terminate unused instances idle for longer than this
+        """
+        self.base_dir = os.path.abspath(base_dir)
+        self.max_idle_s = max_idle_s
+        # Open lock file descriptors of the instances this process holds
+        self._locks = {}
+
+    def _instance_dirs(self) -> List[str]:
+        if not os.path.isdir(self.base_dir):
+            return []
+        return [
+            os.path.join(self.base_dir, name)
+            for name in sorted(os.listdir(self.base_dir))
+            if name.startswith('port-') and os.path.isdir(os.path.join(self.base_dir, name))
+        ]
+
+    def _read_instance(self, instance_dir: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(instance_dir, INSTANCE_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_instance(self, instance_dir: str, meta: dict):
+        path = os.path.join(instance_dir, INSTANCE_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def _lock_owner(self, instance_dir: str) -> Optional[int]:
+        try:
+            with open(os.path.join(instance_dir, LOCK_FILE), 'r') as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def _is_locked(self, instance_dir: str) -> bool:
+        if instance_dir in self._locks:
+            return True
+        try:
+            fd = os.open(os.path.join(instance_dir, LOCK_FILE), os.O_RDWR)
+        except FileNotFoundError:
+            return False
+        try:
+            _lock_fd(fd)
+        except OSError:
+            return True
+        finally:
+            # Closing drops the probe's lock
+            os.close(fd)
+        return False
+
+    def _try_lock(self, instance_dir: str) -> bool:
+        """
+        Take the instance lock for this process until _unlock or exit.
+        """
+        if instance_dir in self._locks:
+            return False
+        fd = os.open(os.path.join(instance_dir, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            _lock_fd(fd)
+        except OSError:
+            os.close(fd)
+            return False
+        # The PID is only informational (chrome_manager.py list)
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, str(os.getpid()).encode())
+        self._locks[instance_dir] = fd
+        return True
+
+    def _unlock(self, instance_dir: str):
+        fd = self._locks.pop(instance_dir, None)
+        if fd is not None:
+            os.close(fd)
+
+    def _forget(self, instance_dir: str):
+        """
+        Drop an instance's record; the lock file stays, since another run
+        may hold a lock on it.
+        """
+        self._unlock(instance_dir)
+        try:
+            os.remove(os.path.join(instance_dir, INSTANCE_FILE))
+        except FileNotFoundError:
+            pass
+
+    def _is_running(self, meta: dict) -> bool:
+        """
+        Whether the instance's Chrome is still running; records without a
+        start time (older versions) can't be told apart from a reused PID.
+        """
+        return meta.get('create_time') is not None and is_process_alive(meta.get('pid'), meta['create_time'])
+
+    def reap_orphans(self) -> int:
+        """
+        Clean up dead instances and terminate unlocked ones idle past max_idle_s.
+
+        Returns the number of instances reaped.
+        """
+        reaped = 0
+        now = time.time()
+        for instance_dir in self._instance_dirs():
+            meta = self._read_instance(instance_dir)
+            if meta is None:
+                continue
+            # Hold the lock while reaping, so no run can reuse the instance meanwhile
+            if not self._try_lock(instance_dir):
+                continue
+            try:
+                if not self._is_running(meta):
+                    self._forget(instance_dir)
+                    reaped += 1
+                elif now - meta.get('last_used', 0) > self.max_idle_s:
+                    print(f"Reaping idle Chrome on port {meta['port']} (pid {meta['pid']})")
+                    terminate_process_tree(meta['pid'], create_time=meta['create_time'])
+                    self._forget(instance_dir)
+                    reaped += 1
+            finally:
+                self._unlock(instance_dir)
+        return reaped
+
+    def list_instances(self) -> List[dict]:
+        instances = []
+        for instance_dir in self._instance_dirs():
+            meta = self._read_instance(instance_dir)
+            if meta is not None:
+                meta['alive'] = self._is_running(meta)
+                meta['locked_by'] = self._lock_owner(instance_dir) if self._is_locked(instance_dir) else None
+                instances.append(meta)
+        return instances
+
+    async def _reuse(self, chrome_path: str, extra_args: Optional[List[str]],
+                     port: Optional[int]) -> Optional[ChromeInstance]:
+        """
+        Lock and return an idle instance of the same Chrome started with the
+        same arguments, if one is healthy.
+        """
+        for instance_dir in self._instance_dirs():
+            meta = self._read_instance(instance_dir)
+            if meta is None or meta.get('chrome_path') != chrome_path:
+                continue
+            if meta.get('extra_args') != _normalized_args(extra_args):
+                continue
+            if port is not None and meta.get('port') != port:
+                continue
+            if not self._try_lock(instance_dir):
+                continue
+            # Re-read under the lock: the instance may have been reaped meanwhile
+            meta = self._read_instance(instance_dir)
+            if meta is None or not self._is_running(meta):
+                self._unlock(instance_dir)
+                continue
+            try:
+                version = await wait_for_devtools(meta['port'], timeout=2.0)
+            except TimeoutError:
+                self._unlock(instance_dir)
+                continue
+            print(f"Reusing Chrome on port {meta['port']} (pid {meta['pid']})")
+            return ChromeInstance(meta['port'], instance_dir, meta['pid'], chrome_path,
+                                  version.get('webSocketDebuggerUrl'))
+        return None
+
+    async def acquire(
+        self,
+        chrome_path: str,
+        extra_args: Optional[List[str]] = None,
+        port: Optional[int] = None,
+        timeout: float = 15.0
+    ) -> ChromeInstance:
+        """
+        Return a ready Chrome instance for this run.
+
+        Reuses an idle instance of the same executable and arguments when one is running,
+        attaches to whatever already listens on an explicitly requested port,
+        and otherwise launches Chrome on a free port with its own profile.
+
+        Args:
+            chrome_path: Path to the Chrome executable
+            extra_args: Extra arguments for a newly launched Chrome
+            port: Remote debugging port to use instead of a free one
+            timeout: Seconds to wait for Chrome to accept DevTools connections
+        """
+        self.reap_orphans()
+
+        instance = await self._reuse(chrome_path, extra_args, port)
+        if instance is not None:
+            return instance
+
+        if port is not None:
+            # Something not managed by us may already be listening there
+            try:
+                version = await wait_for_devtools(port, timeout=0.5)
+                print(f"Attaching to Chrome already running on port {port}")
+                return ChromeInstance(port, ws_url=version.get('webSocketDebuggerUrl'))
+            except TimeoutError:
+                pass
+
+        port = port or find_free_port()
+        instance_dir = os.path.join(self.base_dir, f"port-{port}")
+        os.makedirs(instance_dir, exist_ok=True)
+        if not self._try_lock(instance_dir):
+            raise RuntimeError(f"Chrome profile {instance_dir} is in use by another run")
+
+        args = [
+            chrome_path,
+            f"--remote-debugging-port={port}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            f"--user-data-dir={instance_dir}"  # Use a separate user data directory per instance
+        ]
+        args += [arg for arg in (extra_args or []) if not arg.startswith('--remote-debugging-port')]
+
+        try:
+            process = subprocess.Popen(
+                args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+            )
+        except Exception:
+            self._unlock(instance_dir)
+            raise
+
+        now = time.time()
+        self._write_instance(instance_dir, {
+            'pid': process.pid,
+            'create_time': process_create_time(process.pid),
+            'port': port,
+            'chrome_path': chrome_path,
+            'extra_args': _normalized_args(extra_args),
+            'started_at': now,
+            'last_used': now
+        })
+
+        try:
+            started = time.monotonic()
+            version = await wait_for_devtools(port, timeout=timeout)
+        except TimeoutError:
+            terminate_process_tree(process.pid)
+            self._forget(instance_dir)
+            raise
+        print(f"Chrome started with remote debugging on port {port} "
+              f"(ready in {time.monotonic() - started:.2f}s)")
+        return ChromeInstance(port, instance_dir, process.pid, chrome_path,
+                              version.get('webSocketDebuggerUrl'))
+
+    def release(self, instance: ChromeInstance, keep_alive: bool = True):
+        """
+        Give an instance back.
+
+        With keep_alive the Chrome process stays up for later runs to reuse
+        (until it has been idle for max_idle_s); otherwise it is terminated.
+        """
+        if instance.pid is None or instance.profile_dir is None:
+            return
+        if keep_alive:
+            meta = self._read_instance(instance.profile_dir)
+            if meta is not None:
+                meta['last_used'] = time.time()
+                self._write_instance(instance.profile_dir, meta)
+            self._unlock(instance.profile_dir)
+        else:
+            terminate_process_tree(instance.pid)
+            self._forget(instance.profile_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage Chrome instances started by cli.py')
+    parser.add_argument('command', choices=['list', 'reap'],
+                        help='list: show managed instances; reap: clean up dead and idle instances')
+    parser.add_argument('--base-dir', type=str, default=DEFAULT_BASE_DIR,
+                        help=f'Directory holding the instance profiles (default: {DEFAULT_BASE_DIR})')
+    parser.add_argument('--max-idle', type=float, default=1800.0,
+                        help='Reap unused instances idle for more than this many seconds (default: 1800)')
+    args = parser.parse_args()
+
+    manager = ChromeManager(args.base_dir, max_idle_s=args.max_idle)
+    if args.command == 'reap':
+        print(f"Reaped {manager.reap_orphans()} instance(s)")
+    else:
+        for meta in manager.list_instances():
+            state = 'in use' if meta['locked_by'] else ('idle' if meta['alive'] else 'dead')
+            print(f"port {meta['port']}  pid {meta['pid']}  {state}  {meta['chrome_path']}")
+
+if __name__ == "__main__":
+    main()
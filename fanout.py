@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Parallel multi-tab fetching for the research agent.
+
+Research tasks often read several independent pages one after another, one
+agent step (and one LLM call) per page. fanout_controller adds a
+`fetch_pages_in_parallel` action to the agent: it opens up to `max_tabs`
+background tabs at once in the agent's own browser context, so they share
+its cookies, stealth script, network profile and HTTP cache. Each tab
+extracts what matches the goal from its page, and the results are merged
+into one action result in the agent's memory. Every tab has its own timeout;
+a slow or failing page is reported and does not hold up the others.
+"""
+import asyncio
+import time
+from typing import List
+
+from browser_use import ActionResult, Controller
+from browser_use.browser.context import BrowserContext
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel
+
+from profiler import span
+
+DEFAULT_MAX_TABS = 4
+DEFAULT_TAB_TIMEOUT_S = 30.0
+
+# URLs accepted per action; the rest are reported as skipped
+MAX_URLS = 20
+
+# Page text passed to the extraction model, and kept when there is none
+MAX_PAGE_CHARS = 20000
+MAX_RAW_CHARS = 3000
+
+EXTRACTION_PROMPT = (
+    "Extract the information relevant to this goal from the page below. Answer with the "
+    "facts only, or 'nothing relevant' if the page has none.\n\nGoal: {goal}\n\n"
+    "Page {url} ({title}):\n{text}"
+)
+
+class FetchPagesAction(BaseModel):
+    urls: List[str]
+    goal: str
+
+async def fetch_tab(context, url: str, goal: str, llm=None) -> dict:
+    """
+    Load url in a new tab of context and extract what matches goal.
+    """
+    page = await context.new_page()
+    try:
+        await page.goto(url, wait_until='domcontentloaded')
+        title = await page.title()
+        text = (await page.inner_text('body'))[:MAX_PAGE_CHARS]
+        if llm is not None:
+            answer = await llm.ainvoke([HumanMessage(content=EXTRACTION_PROMPT.format(
+                goal=goal, url=url, title=title, text=text
+            ))])
+            content = answer.content if isinstance(answer.content, str) else str(answer.content)
+        else:
+            content = text[:MAX_RAW_CHARS]
+        return {'url': url, 'title': title, 'status': 'ok', 'content': content}
+    finally:
+        await page.close()
+
+async def fan_out(browser_context: BrowserContext, urls: List[str], goal: str, llm=None,
+                  max_tabs: int = DEFAULT_MAX_TABS,
+                  tab_timeout_s: float = DEFAULT_TAB_TIMEOUT_S) -> List[dict]:
+    """
+    Fetch urls in at most max_tabs tabs at a time, in the order given.
+
+    The agent stays on its page: browser_use forgets which tab is current
+    when a tab opens, so that is put back once the tabs are done.
+    """
+    session = await browser_context.get_session()
+    current_page = await browser_context.get_current_page()
+    target_id = browser_context.state.target_id
+    semaphore = asyncio.Semaphore(max(1, max_tabs))
+
+    async def one(url: str) -> dict:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                with span('fanout.tab', 'fanout', url=url):
+                    result = await asyncio.wait_for(fetch_tab(session.context, url, goal, llm), tab_timeout_s)
+            except asyncio.TimeoutError:
+                result = {'url': url, 'status': 'timeout',
+                          'content': f"timed out after {tab_timeout_s:g}s"}
+            except Exception as e:
+                result = {'url': url, 'status': 'error', 'content': str(e)}
+            result['duration_s'] = round(time.perf_counter() - started, 3)
+            return result
+
+    try:
+        return await asyncio.gather(*(one(url) for url in urls))
+    finally:
+        browser_context.state.target_id = target_id
+        try:
+            await current_page.bring_to_front()
+        except Exception:
+            pass
+
+def format_results(results: List[dict], wall_s: float, skipped: List[str]) -> str:
+    ok = sum(r['status'] == 'ok' for r in results)
+    lines = [f"Fetched {ok}/{len(results)} page(s) in parallel in {wall_s:.1f}s "
+             f"({sum(r['duration_s'] for r in results):.1f}s of tab time)"]
+    for r in results:
+        heading = f"{r['url']} ({r['title']})" if r.get('title') else r['url']
+        if r['status'] != 'ok':
+            heading += f" [{r['status']}]"
+        lines.append(f"\n## {heading}\n{r['content']}")
+    if skipped:
+        lines.append(f"\nSkipped (more than {MAX_URLS} URLs): {', '.join(skipped)}")
+    return '\n'.join(lines)
+
+def fanout_controller(llm=None, max_tabs: int = DEFAULT_MAX_TABS,
+                      tab_timeout_s: float = DEFAULT_TAB_TIMEOUT_S) -> Controller:
+    """
+    Controller with the default actions plus fetch_pages_in_parallel.
+
+    Args:
+        llm: Model that extracts the goal from each page; without one, the
+            start of each page's text is returned
+        max_tabs: Maximum number of tabs open at the same time
+        tab_timeout_s: Seconds each tab gets to load and extract
+    """
+    controller = Controller()
+
+    @controller.action(
+        'Open several independent URLs at once in background tabs and extract the information '
+        'matching goal from each page. Use this instead of visiting pages one by one when you '
+        'already know their URLs and only need to read them.',
+        param_model=FetchPagesAction
+    )
+    async def fetch_pages_in_parallel(params: FetchPagesAction, browser: BrowserContext):
+        urls, skipped = params.urls[:MAX_URLS], params.urls[MAX_URLS:]
+        started = time.perf_counter()
+        results = await fan_out(browser, urls, params.goal, llm=llm,
+                                max_tabs=max_tabs, tab_timeout_s=tab_timeout_s)
+        content = format_results(results, time.perf_counter() - started, skipped)
+        print(content.split('\n', 1)[0])
+        return ActionResult(extracted_content=content, include_in_memory=True)
+
+    return controller
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory agent history.
+
+browser_use keeps every step's screenshot (base64) and extracted content in
+agent.history for the whole run and builds agent_history.gif from those
+screenshots at the end, so memory grows with the number of steps. With a
+HistoryStore, each step's screenshot is written to disk as soon as the step
+ends, and extracted content over a size limit is written to disk and replaced
+with a preview and the file path. Only these compact references stay in
+memory. The history GIF is then written one frame at a time from the files on
+disk.
+
+Files are named step-0001.png, step-0001-result-0.txt, ... in the store's
+directory, so a resumed run keeps numbering from where it stopped.
+"""
+import base64
+import glob
+import os
+from typing import List
+
+from agent_mixins import with_mixin
+
+# Extracted content longer than this is moved to disk
+DEFAULT_SPILL_CHARS = 4000
+
+# Characters of spilled content kept in memory
+PREVIEW_CHARS = 500
+
+# Display time of each frame in the history GIF
+GIF_FRAME_MS = 1000
+
+GIF_NAME = 'agent_history.gif'
+
+class HistoryStore:
+    """
+    On-disk store for the screenshots and large extracted content of one run.
+    """
+    def __init__(self, directory: str, spill_chars: int = DEFAULT_SPILL_CHARS):
+        """
+        Args:
+            directory: Directory for this run's files; created if missing
+            spill_chars: Extracted content longer than this is moved to disk
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.spill_chars = spill_chars
+        self.screenshots: List[str] = sorted(glob.glob(os.path.join(directory, 'step-*.png')))
+        self.steps = len(self.screenshots)
+        self.spilled_bytes = 0
+
+    def _write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.spilled_bytes += len(data)
+        return path
+
+    def spill_screenshot(self, item):
+        """
+        Move a history item's screenshot to disk.
+        """
+        self.steps += 1
+        state = getattr(item, 'state', None)
+        screenshot = getattr(state, 'screenshot', None)
+        if screenshot:
+            self.screenshots.append(self._write(f"step-{self.steps:04d}.png", base64.b64decode(screenshot)))
+            state.screenshot = None
+
+    def spill_results(self, item, step: int):
+        """
+        Move a history item's large extracted content to disk, keeping a preview.
+        """
+        for index, result in enumerate(getattr(item, 'result', None) or []):
+            content = result.extracted_content
+            if content and len(content) > self.spill_chars:
+                path = self._write(f"step-{step:04d}-result-{index}.txt", content.encode('utf-8'))
+                result.extracted_content = (
+                    f"{content[:PREVIEW_CHARS]}\n[... {len(content)} characters, full content in {path}]"
+                )
+
+    def write_gif(self, path: str = None, frame_ms: int = GIF_FRAME_MS):
+        """
+        Write the history GIF from the screenshots on disk, one frame at a time.
+
+        Returns the GIF's path, or None when there is nothing to write.
+        """
+        if not self.screenshots:
+            return None
+        try:
+            from PIL import GifImagePlugin, Image
+        except ImportError:
+            print("Pillow is not installed; skipping the history GIF")
+            return None
+
+        path = path or os.path.join(self.directory, GIF_NAME)
+        size = None
+        with open(path, 'wb') as out:
+            for screenshot in self.screenshots:
+                with Image.open(screenshot) as image:
+                    frame = image.convert('RGB')
+                    if size is None:
+                        size = frame.size
+                    elif frame.size != size:
+                        frame = frame.resize(size)
+                    # Each frame gets its own palette
+                    frame = frame.quantize(colors=256)
+                    if out.tell() == 0:
+                        for chunk in GifImagePlugin.getheader(frame, info={'loop': 0})[0]:
+                            out.write(chunk)
+                    for chunk in GifImagePlugin.getdata(frame, duration=frame_ms, include_color_table=True):
+                        out.write(chunk)
+            out.write(b';')
+        return path
+
+    def summary(self) -> str:
+        return (f"History: {len(self.screenshots)} screenshot(s) and large results "
+                f"({self.spilled_bytes / (1024 * 1024):.1f} MB) kept in {self.directory}")
+
+class BoundedHistoryMixin:
+    """
+    Agent mixin that moves each step's screenshot and large extracted content
+    to `history_store` once the step ends.
+
+    A step's results are passed to the LLM at the start of the next step, so
+    their content is moved one step later.
+    """
+    history_store: HistoryStore
+    _screenshots_spilled = 0
+    _results_spilled = 0
+
+    async def step(self, *args, **kwargs):
+        try:
+            return await super().step(*args, **kwargs)
+        finally:
+            self.compact_history()
+
+    def compact_history(self):
+        """
+        Spill every screenshot, and the results of all but the last step.
+        """
+        history = self.history.history
+        for item in history[self._screenshots_spilled:]:
+            self.history_store.spill_screenshot(item)
+        self._screenshots_spilled = len(history)
+        first_step = self.history_store.steps - len(history) + 1
+        for index in range(self._results_spilled, len(history) - 1):
+            self.history_store.spill_results(history[index], first_step + index)
+        self._results_spilled = max(self._results_spilled, len(history) - 1)
+
+def bounded_history(agent_class):
+    """
+    Return a subclass of agent_class with BoundedHistoryMixin.
+    """
+    return with_mixin(BoundedHistoryMixin, agent_class, 'BoundedHistory')
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk HTTP cache shared between research runs.
+
+Browser contexts start from a clean profile on every run, so repeat visits
+to the same sites download everything again. This cache sits in front of
+the network through Playwright request routing: fresh responses are served
+from disk, stale ones are revalidated with their ETag/Last-Modified
+validators, and everything else goes to the network and is stored when the
+response headers allow it.
+
+Entries are indexed in SQLite (WAL mode) with bodies in one file per entry,
+so several runs can share a cache directory at once. The cache is evicted
+by age and then least-recently-used order to stay under its size limit.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+DEFAULT_MAX_MB = 500
+DEFAULT_MAX_AGE_DAYS = 7
+
+# Heuristic freshness for responses with Last-Modified but no explicit
+# lifetime (RFC 9111 section 4.2.2), capped at one day
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX_S = 24 * 3600
+
+# Headers that describe the original transfer rather than the stored body
+# (Playwright hands us the decoded body)
+TRANSFER_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+
+# How many stores between size checks
+EVICT_EVERY = 50
+
+# Request headers that make the response depend on who is asking
+CREDENTIAL_HEADERS = {'authorization', 'cookie'}
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def _cache_control(headers: Dict[str, str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in headers.get('cache-control', '').split(','):
+        name, _, value = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+def freshness_lifetime(headers: Dict[str, str], now: float) -> float:
+    """
+    Seconds a response stays fresh, from Cache-Control, Expires or Last-Modified.
+
+    no-cache responses are never fresh, whatever their max-age, so every use
+    revalidates them.
+    """
+    directives = _cache_control(headers)
+    if 'no-cache' in directives:
+        return 0.0
+    for name in ('s-maxage', 'max-age'):
+        value = directives.get(name)
+        if value and value.isdigit():
+            return float(value)
+
+    date = _parse_http_date(headers.get('date')) or now
+    expires = _parse_http_date(headers.get('expires'))
+    if expires is not None:
+        return max(0.0, expires - date)
+
+    last_modified = _parse_http_date(headers.get('last-modified'))
+    if last_modified is not None:
+        return min(HEURISTIC_MAX_S, max(0.0, (date - last_modified) * HEURISTIC_FRACTION))
+    return 0.0
+
+def is_storable(status: int, headers: Dict[str, str], request_headers: Optional[Dict[str, str]] = None) -> bool:
+    """
+    Whether a GET response may go into a cache shared between runs.
+
+    Responses to requests that carried credentials (Authorization or cookies)
+    are only stored when the response is explicitly public.
+    """
+    if status != 200:
+        return False
+    directives = _cache_control(headers)
+    if 'no-store' in directives or 'private' in directives:
+        return False
+    if 'set-cookie' in headers:
+        return False
+    request_headers = {k.lower() for k in request_headers or {}}
+    if request_headers & CREDENTIAL_HEADERS and 'public' not in directives:
+        return False
+    vary = {v.strip().lower() for v in headers.get('vary', '').split(',') if v.strip()}
+    return not (vary - {'accept-encoding'})
+
+class CacheStats:
+    """
+    Cache counters for one browser context.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stored = 0
+        self.bytes_from_cache = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.revalidated + self.misses
+        return (self.hits + self.revalidated) / total if total else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"HTTP cache: {self.hits} hit(s), {self.revalidated} revalidated, "
+            f"{self.misses} miss(es) ({self.hit_rate:.0%} hit rate), {self.stored} stored, "
+            f"{self.bytes_from_cache / (1024 * 1024):.1f} MB served from disk"
+        )
+
+class HttpCache:
+    """
+    Size- and age-bounded HTTP response cache in a directory.
+    """
+    def __init__(
+        self,
+        cache_dir: str,
+        max_mb: float = DEFAULT_MAX_MB,
+        max_age_days: float = DEFAULT_MAX_AGE_DAYS
+    ):
+        """
+        Args:
+            cache_dir: Directory for the index and response bodies
+            max_mb: Evict least recently used entries beyond this total size
+            max_age_days: Evict entries stored longer ago than this
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.bodies_dir = os.path.join(self.cache_dir, 'bodies')
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age_s = max_age_days * 24 * 3600
+        self._stores_since_evict = 0
+        os.makedirs(self.bodies_dir, exist_ok=True)
+
+        self.db = sqlite3.connect(os.path.join(self.cache_dir, 'index.sqlite'),
+                                  timeout=30, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body_file TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+        self.evict()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.bodies_dir, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def lookup(self, key: str) -> Optional[dict]:
+        """
+        Return the stored entry with its body, or None on a miss.
+        """
+        row = self.db.execute(
+            'SELECT status, headers, body_file, size, expires_at FROM entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, headers, body_file, size, expires_at = row
+        try:
+            with open(os.path.join(self.bodies_dir, body_file), 'rb') as f:
+                body = f.read()
+        except OSError:
+            # Evicted by another run between the lookup and the read
+            return None
+        self.db.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+        return {'status': status, 'headers': json.loads(headers), 'body': body,
+                'size': size, 'expires_at': expires_at}
+
+    def store(self, key: str, status: int, headers: Dict[str, str], body: bytes):
+        now = time.time()
+        headers = {k: v for k, v in headers.items() if k.lower() not in TRANSFER_HEADERS}
+        path = self._body_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        self.db.execute(
+            'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, status, json.dumps(headers), os.path.basename(path), len(body),
+             now, now + freshness_lifetime(headers, now), now)
+        )
+        self._stores_since_evict += 1
+        if self._stores_since_evict >= EVICT_EVERY:
+            self.evict()
+
+    def refresh(self, key: str, headers: Dict[str, str]):
+        """
+        Extend an entry's freshness after a 304 Not Modified.
+        """
+        now = time.time()
+        self.db.execute(
+            'UPDATE entries SET expires_at = ?, last_access = ? WHERE key = ?',
+            (now + freshness_lifetime(headers, now), now, key)
+        )
+
+    def _delete(self, rows):
+        for key, body_file in rows:
+            self.db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            try:
+                os.remove(os.path.join(self.bodies_dir, body_file))
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """
+        Drop entries older than max_age, then least recently used ones until
+        the cache is under max_bytes.
+        """
+        self._stores_since_evict = 0
+        self._delete(self.db.execute(
+            'SELECT key, body_file FROM entries WHERE stored_at < ?', (time.time() - self.max_age_s,)
+        ).fetchall())
+
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, body_file, size in self.db.execute(
+            'SELECT key, body_file, size FROM entries ORDER BY last_access'
+        ):
+            if total <= self.max_bytes:
+                break
+            victims.append((key, body_file))
+            total -= size
+        self._delete(victims)
+
+    def close(self):
+        self.db.close()
+
+    async def attach(self, context) -> CacheStats:
+        """
+        Serve a Playwright context's GET requests through the cache.
+
+        Attach before other request routes (such as a network profile) so
+        those run first and fall back to the cache.
+
+        Range requests go straight to the network. Requests with cookies or
+        an Authorization header are never answered from the cache, since
+        the stored response may belong to someone else; their responses are
+        still stored when marked public.
+        """
+        stats = CacheStats()
+
+        async def fulfill_from_cache(route, entry):
+            stats.bytes_from_cache += entry['size']
+            await route.fulfill(status=entry['status'], headers=entry['headers'], body=entry['body'])
+
+        async def handle_route(route):
+            request = route.request
+            if request.method != 'GET' or not request.url.startswith(('http://', 'https://')):
+                await route.fallback()
+                return
+
+            try:
+                request_headers = await request.all_headers()
+            except Exception:
+                await route.fallback()
+                return
+            if 'range' in request_headers:
+                await route.fallback()
+                return
+
+            key = request.url
+            entry = None if request_headers.keys() & CREDENTIAL_HEADERS else self.lookup(key)
+            if entry is not None and entry['expires_at'] > time.time():
+                stats.hits += 1
+                await fulfill_from_cache(route, entry)
+                return
+
+            # Stale entries (must-revalidate or not) are only served after a 304
+            try:
+                headers = None
+                if entry is not None:
+                    validators = {}
+                    if 'etag' in entry['headers']:
+                        validators['if-none-match'] = entry['headers']['etag']
+                    if 'last-modified' in entry['headers']:
+                        validators['if-modified-since'] = entry['headers']['last-modified']
+                    if validators:
+                        headers = {**request_headers, **validators}
+                response = await route.fetch(headers=headers, max_redirects=0)
+            except Exception:
+                await route.fallback()
+                return
+
+            if response.status == 304 and entry is not None:
+                stats.revalidated += 1
+                # A 304 updates the stored headers it repeats (RFC 9111 section 4.3.4)
+                self.refresh(key, {**entry['headers'], **response.headers})
+                await fulfill_from_cache(route, entry)
+                return
+
+            stats.misses += 1
+            body = await response.body()
+            if is_storable(response.status, response.headers, request_headers):
+                self.store(key, response.status, response.headers, body)
+                stats.stored += 1
+            # Live responses keep their cookies; only the stored copy drops them
+            live_headers = {k: v for k, v in response.headers.items()
+                            if k.lower() == 'set-cookie' or k.lower() not in TRANSFER_HEADERS}
+            await route.fulfill(status=response.status, headers=live_headers, body=body)
+
+        await context.route('**/*', handle_route)
+        return stats
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for LLM responses, with an offline replay mode.
+
+CachedChatModel wraps the chat model passed to the Agent. Every call is
+keyed by a hash of the model name, the normalized message list and the call
+options (bound tools, stop words), and the response is stored on disk. A
+rerun of the same task with the same page states gets its responses from
+the cache instead of the API (the step timestamp and screenshots, which
+differ on every run, are left out of the key); in replay mode a cache miss is an error, so
+runs never touch the network for the LLM.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from chat_wrapper import ChatModelWrapper
+
+DEFAULT_MAX_MB = 200
+
+# browser_use stamps every state message with the wall-clock time, right
+# after the step counter
+TIMESTAMP = re.compile(r'Current date and time: [^\n]*')
+
+class LLMCacheMiss(RuntimeError):
+    """
+    Raised in replay mode when a call is not in the cache.
+    """
+
+def _normalize_content(content):
+    """
+    Drop the timestamp from text and the data from screenshots; a
+    screenshot only counts as being there.
+    """
+    if isinstance(content, str):
+        return TIMESTAMP.sub('', content)
+    parts = []
+    for part in content:
+        if isinstance(part, dict) and part.get('type') == 'image_url':
+            parts.append({'type': 'image_url'})
+        elif isinstance(part, dict) and part.get('type') == 'text':
+            parts.append({**part, 'text': TIMESTAMP.sub('', part['text'])})
+        else:
+            parts.append(_normalize_content(part) if isinstance(part, str) else part)
+    return parts
+
+def _normalize_message(message: BaseMessage) -> dict:
+    """
+    Keep only what determines the model's answer; ids and response metadata
+    change between otherwise identical runs, and so do timestamps and screenshots.
+    """
+    normalized = {'type': message.type, 'content': _normalize_content(message.content)}
+    tool_calls = getattr(message, 'tool_calls', None)
+    if tool_calls:
+        normalized['tool_calls'] = [{'name': c['name'], 'args': c['args']} for c in tool_calls]
+    if getattr(message, 'tool_call_id', None):
+        normalized['tool_call_id'] = message.tool_call_id
+    return normalized
+
+def cache_key(model: str, messages: List[BaseMessage], stop: Optional[List[str]], options: dict) -> str:
+    payload = json.dumps({
+        'model': model,
+        'messages': [_normalize_message(m) for m in messages],
+        'stop': stop,
+        'options': options
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMResponseCache:
+    """
+    SQLite store of serialized chat results with LRU eviction by size.
+    """
+    def __init__(self, cache_dir: str, max_mb: float = DEFAULT_MAX_MB):
+        """
+        Args:
+            cache_dir: Directory holding the cache database
+            max_mb: Evict least recently used responses beyond this total size
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'llm_cache.sqlite'),
+                                  timeout=30, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+
+    def get(self, key: str) -> Optional[ChatResult]:
+        row = self.db.execute('SELECT payload FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.db.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+        payload = json.loads(row[0])
+        messages = messages_from_dict([g['message'] for g in payload['generations']])
+        return ChatResult(
+            generations=[
+                ChatGeneration(message=message, generation_info=g.get('generation_info'))
+                for message, g in zip(messages, payload['generations'])
+            ],
+            llm_output=payload.get('llm_output')
+        )
+
+    def put(self, key: str, model: str, result: ChatResult):
+        payload = json.dumps({
+            'generations': [
+                {'message': message_to_dict(g.message), 'generation_info': g.generation_info}
+                for g in result.generations
+            ],
+            'llm_output': result.llm_output
+        }, default=str)
+        now = time.time()
+        self.db.execute(
+            'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+            (key, model, payload, len(payload), now, now)
+        )
+        self.evict()
+
+    def evict(self):
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self.db.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self.db.executemany('DELETE FROM responses WHERE key = ?', victims)
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"LLM cache: {self.hits} hit(s), {self.misses} miss(es) ({rate:.0%} hit rate)"
+
+    def close(self):
+        self.db.close()
+
+class CachedChatModel(ChatModelWrapper):
+    """
+    Chat model that answers from an LLMResponseCache before calling `inner`.
+    """
+    inner: BaseChatModel
+    response_cache: Any
+    replay: bool = False
+    model_name: str = ''
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if not self.model_name:
+            self.model_name = getattr(self.inner, 'model_name', None) or getattr(self.inner, 'model', '') or ''
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.inner._llm_type}"
+
+    def _lookup(self, messages, stop, kwargs):
+        key = cache_key(self.model_name, messages, stop, kwargs)
+        result = self.response_cache.get(key)
+        if result is None and self.replay:
+            raise LLMCacheMiss(
+                f"Replay mode: no cached response for this {self.model_name} call "
+                f"(key {key[:12]}); rerun without --replay to record it"
+            )
+        return key, result
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key, result = self._lookup(messages, stop, kwargs)
+        if result is None:
+            result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self.response_cache.put(key, self.model_name, result)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key, result = self._lookup(messages, stop, kwargs)
+        if result is None:
+            result = await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self.response_cache.put(key, self.model_name, result)
+        return result
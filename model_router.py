@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Tiered model routing for the research agent.
+
+Most agent steps are routine (click an obvious link, scroll, type into a
+field) and don't need the strongest model. RoutedChatModel sends those to a
+fast model and keeps the strong model for the steps that matter:
+
+- planning: the first agent step of a task
+- extraction: calls without bound tools, such as page content extraction
+- error-recovery: the step after an action failed, plus the next
+  `escalation_steps - 1` steps
+- rejected: the fast model answered without a usable action, so the same
+  call is retried on the strong model
+
+Every call is recorded with its model, reason, latency and token counts.
+"""
+import time
+from collections import defaultdict
+from typing import List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatResult
+
+from chat_wrapper import ChatModelWrapper
+
+# How browser_use reports failed actions back to the model
+ERROR_MARKERS = ('Action error', 'Error executing action')
+
+def model_label(model: BaseChatModel) -> str:
+    inner = getattr(model, 'inner', None)
+    return (getattr(model, 'model_name', None) or getattr(model, 'model', None)
+            or (model_label(inner) if inner is not None else type(model).__name__))
+
+def token_usage(result: ChatResult) -> dict:
+    """
+    Prompt and completion tokens of a chat result, 0 when the provider didn't say.
+    """
+    usage = (result.llm_output or {}).get('token_usage') or {}
+    if not usage and result.generations:
+        metadata = getattr(result.generations[0].message, 'usage_metadata', None) or {}
+        usage = {'prompt_tokens': metadata.get('input_tokens', 0),
+                 'completion_tokens': metadata.get('output_tokens', 0)}
+    return {'prompt_tokens': usage.get('prompt_tokens', 0) or 0,
+            'completion_tokens': usage.get('completion_tokens', 0) or 0}
+
+def _last_action_failed(messages: List[BaseMessage]) -> bool:
+    """
+    Whether the messages since the model's last answer report a failed action.
+    """
+    for message in reversed(messages):
+        if isinstance(message, AIMessage):
+            return False
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if any(marker in content for marker in ERROR_MARKERS):
+            return True
+    return False
+
+class RoutedChatModel(ChatModelWrapper):
+    """
+    Chat model that picks `fast` or `strong` for each call.
+    """
+    fast: BaseChatModel
+    strong: BaseChatModel
+    escalation_steps: int = 2
+    calls: List[dict] = []
+    agent_steps: int = 0
+    escalate_remaining: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return 'routed'
+
+    @property
+    def model_name(self) -> str:
+        return f"{model_label(self.fast)}->{model_label(self.strong)}"
+
+    @property
+    def tool_model(self) -> BaseChatModel:
+        """
+        Tools are formatted like the strong model does; both tiers get the same tools.
+        """
+        return self.strong
+
+    def _choose(self, messages: List[BaseMessage], kwargs: dict):
+        """
+        Return the model to use and why.
+        """
+        if 'tools' not in kwargs:
+            return self.strong, 'extraction'
+        self.agent_steps += 1
+        if self.agent_steps == 1:
+            return self.strong, 'planning'
+        if _last_action_failed(messages):
+            self.escalate_remaining = self.escalation_steps - 1
+            return self.strong, 'error-recovery'
+        if self.escalate_remaining > 0:
+            self.escalate_remaining -= 1
+            return self.strong, 'error-recovery'
+        return self.fast, 'routine'
+
+    def _record(self, model: BaseChatModel, reason: str, started: float, result: ChatResult):
+        self.calls.append({
+            'step': self.agent_steps,
+            'model': model_label(model),
+            'reason': reason,
+            'latency_s': round(time.perf_counter() - started, 3),
+            **token_usage(result)
+        })
+
+    @staticmethod
+    def _rejected(result: ChatResult, kwargs: dict) -> bool:
+        if 'tools' not in kwargs or not result.generations:
+            return False
+        return not getattr(result.generations[0].message, 'tool_calls', None)
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        model, reason = self._choose(messages, kwargs)
+        started = time.perf_counter()
+        result = model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._record(model, reason, started, result)
+        if model is self.fast and self._rejected(result, kwargs):
+            started = time.perf_counter()
+            result = self.strong._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self._record(self.strong, 'rejected', started, result)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        model, reason = self._choose(messages, kwargs)
+        started = time.perf_counter()
+        result = await model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._record(model, reason, started, result)
+        if model is self.fast and self._rejected(result, kwargs):
+            started = time.perf_counter()
+            result = await self.strong._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self._record(self.strong, 'rejected', started, result)
+        return result
+
+    def summary(self) -> str:
+        """
+        Per-model call counts, latency and tokens.
+        """
+        totals = defaultdict(lambda: {'calls': 0, 'latency_s': 0.0, 'tokens': 0})
+        for call in self.calls:
+            total = totals[call['model']]
+            total['calls'] += 1
+            total['latency_s'] += call['latency_s']
+            total['tokens'] += call['prompt_tokens'] + call['completion_tokens']
+        lines = ["Model routing:"]
+        for model, total in totals.items():
+            lines.append(f"  {model}: {total['calls']} call(s), "
+                         f"{total['latency_s'] / total['calls']:.2f}s avg, {total['tokens']} tokens")
+        reasons = defaultdict(int)
+        for call in self.calls:
+            reasons[call['reason']] += 1
+        lines.append("  by reason: " + ', '.join(f"{r} {n}" for r, n in sorted(reasons.items())))
+        return '\n'.join(lines)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Request interception profiles for research browsers.
+
+A profile blocks whole resource types (images, video, fonts) and known
+tracker/ad hosts that a text research agent never needs, with extra allow
+and deny URL patterns on top. Profiles are applied to browser contexts, so
+every page the agent opens is covered.
+
+Blocking uses Playwright request routing, and routing any request turns off
+Chromium's own HTTP cache for the whole context (Playwright can only match
+routes by URL, so blocking resource types means routing every request).
+The persistent HTTP cache in http_cache.py serves repeat downloads instead.
+"""
+from collections import Counter
+from fnmatch import fnmatchcase
+from typing import Iterable, List, Optional
+
+# Tracker and ad hosts blocked by the text-only profile
+TRACKER_PATTERNS = [
+    '*://*.doubleclick.net/*',
+    '*://*.googlesyndication.com/*',
+    '*://*.googletagmanager.com/*',
+    '*://*.googletagservices.com/*',
+    '*://*.google-analytics.com/*',
+    '*://adservice.google.*/*',
+    '*://*.amazon-adsystem.com/*',
+    '*://*.adnxs.com/*',
+    '*://*.criteo.com/*',
+    '*://*.criteo.net/*',
+    '*://*.taboola.com/*',
+    '*://*.outbrain.com/*',
+    '*://*.scorecardresearch.com/*',
+    '*://*.chartbeat.com/*',
+    '*://*.chartbeat.net/*',
+    '*://*.hotjar.com/*',
+    '*://*.optimizely.com/*',
+    '*://connect.facebook.net/*',
+    '*://*.quantserve.com/*',
+    '*://*.moatads.com/*',
+]
+
+# Named profiles: resource types to block and whether to block trackers.
+# Stylesheets are never blocked because the agent relies on layout to decide
+# which elements are visible and clickable.
+NETWORK_PROFILES = {
+    'full': {'resource_types': set(), 'block_trackers': False},
+    'no-media': {'resource_types': {'image', 'media'}, 'block_trackers': False},
+    'text-only': {'resource_types': {'image', 'media', 'font'}, 'block_trackers': True},
+}
+
+# Rough transfer sizes used to estimate bandwidth saved by blocked requests,
+# since a blocked response is never downloaded
+ESTIMATED_BYTES = {
+    'image': 45_000,
+    'media': 500_000,
+    'font': 30_000,
+    'script': 25_000,
+    'stylesheet': 15_000,
+    'xhr': 5_000,
+    'fetch': 5_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+def _format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+class NetworkStats:
+    """
+    Counters for one browser context.
+    """
+    def __init__(self):
+        self.requests_allowed = 0
+        self.requests_blocked = 0
+        self.blocked_by_type = Counter()
+        # Only responses with a Content-Length are counted, so chunked and
+        # streamed responses are missing and this is a lower bound
+        self.bytes_downloaded = 0
+        self.bytes_saved_estimate = 0
+
+    def summary(self) -> str:
+        blocked_types = ', '.join(f"{kind} {count}" for kind, count in self.blocked_by_type.most_common())
+        return (
+            f"Network: {self.requests_blocked} request(s) blocked"
+            f"{f' ({blocked_types})' if blocked_types else ''}, "
+            f"~{_format_bytes(self.bytes_saved_estimate)} saved (estimated), "
+            f"{self.requests_allowed} allowed, at least {_format_bytes(self.bytes_downloaded)} downloaded"
+        )
+
+class NetworkProfile:
+    """
+    Decides which requests to block and applies that to Playwright contexts.
+    """
+    def __init__(
+        self,
+        name: str = 'full',
+        allow: Optional[Iterable[str]] = None,
+        deny: Optional[Iterable[str]] = None
+    ):
+        """
+        Args:
+            name: One of NETWORK_PROFILES
+            allow: URL glob patterns that are never blocked
+            deny: URL glob patterns that are always blocked
+        """
+        if name not in NETWORK_PROFILES:
+            raise ValueError(f"Unknown network profile '{name}', choose from {', '.join(NETWORK_PROFILES)}")
+        profile = NETWORK_PROFILES[name]
+        self.name = name
+        self.blocked_resource_types = set(profile['resource_types'])
+        self.allow: List[str] = list(allow or [])
+        self.deny: List[str] = list(deny or [])
+        if profile['block_trackers']:
+            self.deny += TRACKER_PATTERNS
+
+    @property
+    def blocks_anything(self) -> bool:
+        return bool(self.blocked_resource_types or self.deny)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        """
+        Allow patterns win, then deny patterns, then the blocked resource types.
+        """
+        if any(fnmatchcase(url, pattern) for pattern in self.allow):
+            return False
+        if any(fnmatchcase(url, pattern) for pattern in self.deny):
+            return True
+        return resource_type in self.blocked_resource_types
+
+    async def attach(self, context) -> NetworkStats:
+        """
+        Route every request of a Playwright context through this profile.
+
+        This disables Chromium's HTTP cache for the context, so pages fetch
+        again what they would have taken from it; pair a profile with an
+        HttpCache to keep repeat downloads off the network.
+
+        Returns the NetworkStats that the route handler keeps up to date.
+        """
+        stats = NetworkStats()
+
+        async def handle_route(route):
+            request = route.request
+            if self.should_block(request.url, request.resource_type):
+                stats.requests_blocked += 1
+                stats.blocked_by_type[request.resource_type] += 1
+                stats.bytes_saved_estimate += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+                await route.abort('blockedbyclient')
+            else:
+                # Let other routes (such as the HTTP cache) handle the request
+                stats.requests_allowed += 1
+                await route.fallback()
+
+        def on_response(response):
+            length = response.headers.get('content-length')
+            if length and length.isdigit():
+                stats.bytes_downloaded += int(length)
+
+        await context.route('**/*', handle_route)
+        context.on('response', on_response)
+        return stats
+
+def build_network_profile(
+    name: str = 'full',
+    allow: Optional[Iterable[str]] = None,
+    deny: Optional[Iterable[str]] = None
+) -> Optional[NetworkProfile]:
+    """
+    Return the NetworkProfile for the options, or None when nothing is blocked
+    (so no request interception overhead is added).
+    """
+    profile = NetworkProfile(name, allow, deny)
+    return profile if profile.blocks_anything else None
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Combined Python and browser performance trace of a research run.
+
+A Profiler records spans of the Python side (run_research phases, agent
+steps, LLM calls, actions, stealth setup, parallel tabs) as Chrome trace
+events. Each asyncio task gets its own track, so concurrent work shows up
+side by side. The browser's own trace (navigation, loading, scripting,
+rendering) is recorded over the same run with Playwright's Chromium tracing.
+Both are written to one Chrome trace-format JSON file that opens in
+chrome://tracing or https://ui.perfetto.dev.
+
+Spans go to the profiler active in the current context (a ContextVar that
+tasks inherit), so concurrent runs in one process keep separate profiles.
+When no profiler is active, span() is a no-op.
+"""
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+import weakref
+from contextvars import ContextVar
+from typing import List, Optional
+
+from agent_mixins import with_mixin
+
+# Chromium trace categories recorded by default; the disabled-by-default
+# ones (screenshots, JS sampling) cost too much to leave on
+BROWSER_CATEGORIES = ['devtools.timeline', 'blink.user_timing', 'loading', 'navigation', 'v8.execute']
+
+# Python and browser clocks are both monotonic on Linux and macOS; if the
+# browser's trace start is further than this from ours, align on it instead
+CLOCK_SKEW_LIMIT_US = 1_000_000
+
+_ACTIVE: ContextVar[Optional['Profiler']] = ContextVar('profiler', default=None)
+
+def now_us() -> int:
+    return time.monotonic_ns() // 1000
+
+def span(name: str, cat: str = 'python', **args):
+    """
+    Context manager recording name on the active profiler, if any.
+    """
+    profiler = _ACTIVE.get()
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.span(name, cat, **args)
+
+def active_profiler() -> Optional['Profiler']:
+    return _ACTIVE.get()
+
+class Profiler:
+    """
+    Trace events of one run, with an optional browser trace to merge in.
+    """
+    def __init__(self, browser_categories: List[str] = None):
+        self.pid = os.getpid()
+        self.browser_categories = browser_categories or BROWSER_CATEGORIES
+        self.events: List[dict] = [{
+            'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': 0,
+            'args': {'name': 'research run (Python)'}
+        }]
+        self._tracks = weakref.WeakKeyDictionary()
+        self._threads = {}
+        self._tids = itertools.count(1)
+        self._token = None
+        self._browser = None
+        self._browser_trace_started_us: Optional[int] = None
+        self._browser_trace: Optional[bytes] = None
+
+    def activate(self):
+        self._token = _ACTIVE.set(self)
+
+    def deactivate(self):
+        if self._token is not None:
+            _ACTIVE.reset(self._token)
+            self._token = None
+
+    def _tid(self) -> int:
+        """
+        Track of the current asyncio task, or of the current thread outside one.
+        """
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            ident = threading.get_ident()
+            if ident not in self._threads:
+                self._threads[ident] = self._new_track(threading.current_thread().name)
+            return self._threads[ident]
+        if task not in self._tracks:
+            self._tracks[task] = self._new_track(task.get_name())
+        return self._tracks[task]
+
+    def _new_track(self, name: str) -> int:
+        tid = next(self._tids)
+        self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                            'args': {'name': name}})
+        return tid
+
+    def complete(self, name: str, start_us: int, cat: str = 'python', **args):
+        """
+        Record a span that started at start_us and ends now.
+        """
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'ts': start_us, 'dur': now_us() - start_us,
+                 'pid': self.pid, 'tid': self._tid()}
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name: str, cat: str = 'python', **args):
+        start = now_us()
+        try:
+            yield
+        finally:
+            self.complete(name, start, cat, **args)
+
+    async def start_browser_trace(self, playwright_browser):
+        """
+        Start Chromium tracing on playwright_browser; failures (other
+        browsers, a trace already running) leave the profile Python-only.
+        """
+        try:
+            await playwright_browser.start_tracing(categories=self.browser_categories)
+        except Exception as e:
+            print(f"Browser trace not recorded: {e}")
+            return
+        self._browser = playwright_browser
+        self._browser_trace_started_us = now_us()
+
+    async def stop_browser_trace(self):
+        if self._browser is None:
+            return
+        try:
+            self._browser_trace = await self._browser.stop_tracing()
+        except Exception as e:
+            print(f"Browser trace not recorded: {e}")
+        self._browser = None
+
+    def _browser_events(self) -> List[dict]:
+        if not self._browser_trace:
+            return []
+        trace = json.loads(self._browser_trace)
+        events = trace['traceEvents'] if isinstance(trace, dict) else trace
+        started = [e['ts'] for e in events if e.get('name') == 'TracingStartedInBrowser' and 'ts' in e]
+        if started:
+            skew = started[0] - self._browser_trace_started_us
+            if abs(skew) > CLOCK_SKEW_LIMIT_US:
+                # Different clocks: move our events onto the browser's
+                for event in self.events:
+                    if 'ts' in event:
+                        event['ts'] += skew
+        return events
+
+    def write(self, path: str) -> int:
+        """
+        Write the merged trace to path and return the number of events.
+        """
+        events = self._browser_events() + self.events
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
+
+class ProfilingMixin:
+    """
+    Agent mixin that records each step, LLM call and action batch as spans.
+    """
+    async def step(self, *args, **kwargs):
+        with span('agent.step', 'agent', step=getattr(self, 'n_steps', None)):
+            return await super().step(*args, **kwargs)
+
+    async def get_next_action(self, *args, **kwargs):
+        with span('llm.next_action', 'llm'):
+            return await super().get_next_action(*args, **kwargs)
+
+    async def multi_act(self, actions, *args, **kwargs):
+        names = [name for action in actions for name in action.model_dump(exclude_unset=True)]
+        with span('agent.actions', 'action', actions=names):
+            return await super().multi_act(actions, *args, **kwargs)
+
+def profiling(agent_class):
+    """
+    Return a subclass of agent_class with ProfilingMixin.
+    """
+    return with_mixin(ProfilingMixin, agent_class, 'Profiling')
@@ -6,6 +6,7 @@ const path = require('path');
 const fs = require('fs');
 const WebSocket = require('ws');
 const http = require('http');
+const net = require('net');
 const axios = require('axios');
 
 const app = express();
@@ -13,6 +14,31 @@ const server = http.createServer(app);
 const wss = new WebSocket.Server({ server });
 const PORT = process.env.PORT || 3002;
 
+// Long-lived Python research server (research_server.py); when it is not
+// running, research falls back to spawning cli.py per request
+const RESEARCH_SERVER_URL = process.env.RESEARCH_SERVER_URL || 'http://127.0.0.1:8765';
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// How long a request waits for its research job before answering with an error
+const RESEARCH_JOB_TIMEOUT_MS = parseInt(process.env.RESEARCH_JOB_TIMEOUT_MS, 10) || 30 * 60 * 1000;
+
+// Job options the research server accepts; its executables and Chromium
+// flags come from its own command line
+const RESEARCH_JOB_OPTIONS = ['headless', 'stealth_mode', 'net_profile', 'screencast_port'];
+
+// cli.py processes spawned at the same time when the research server is down
+const MAX_CLI_RUNS = parseInt(process.env.MAX_CLI_RUNS, 10) || 2;
+let cliRuns = 0;
+
+// Screencast frames are skipped for a client while this much is still
+// waiting to be sent to it
+const MAX_CLIENT_BUFFERED_BYTES = 512 * 1024;
+
+// A run's stderr is kept only for the error response, so only its tail is
+// kept; a partial stdout event line longer than this is dropped
+const MAX_ERROR_OUTPUT_CHARS = 64 * 1024;
+const MAX_EVENT_LINE_CHARS = 16 * 1024 * 1024;
+
 // Store WebSocket connections
 const clients = new Set();
 
@@ -28,6 +54,43 @@ function broadcastCliOutput(text) {
   });
 }
 
+// Broadcast a structured run event (cli.py --events ndjson) to all connected clients
+function broadcastRunEvent(event) {
+  clients.forEach(client => {
+    if (client.readyState === WebSocket.OPEN) {
+      client.send(JSON.stringify({
+        type: 'run-event',
+        data: event
+      }));
+    }
+  });
+}
+
+// One readable CLI output line for a run event
+function formatRunEvent(event) {
+  switch (event.event) {
+    case 'start':
+      return `Research run ${event.run_id} started`;
+    case 'step': {
+      const actions = event.actions.length > 0 ? event.actions.join(', ') : 'no action';
+      const timings = [`LLM ${event.llm_s}s`, `action ${event.action_s}s`];
+      if (event.page_load_ms !== null) timings.push(`page load ${Math.round(event.page_load_ms)} ms`);
+      const errors = event.errors.length > 0 ? ` - ERROR: ${event.errors.join('; ')}` : '';
+      return `Step ${event.step}: ${actions} on ${event.url} (${timings.join(', ')})${errors}`;
+    }
+    case 'result':
+      return `Research finished after ${event.steps} step(s) in ${event.duration_s}s`;
+    case 'error':
+      return `ERROR: ${event.message}`;
+    case 'end': {
+      const outcomes = { ok: 'completed', incomplete: 'stopped before finishing the task' };
+      return `Research run ${outcomes[event.status] || 'failed'} in ${event.duration_s}s`;
+    }
+    default:
+      return JSON.stringify(event);
+  }
+}
+
 // Middleware
 app.use(cors());
 app.use(bodyParser.json());
@@ -44,91 +107,156 @@ wss.on('connection', (ws) => {
   });
 });
 
-// Function to connect to Chrome DevTools Protocol and capture screenshots
-async function connectToCDP(port = 9222) {
-  try {
-    // Get the hostname dynamically
-    const hostname = require('os').hostname();
+// Ask the OS for a free TCP port for a run's remote debugging
+function getFreePort() {
+  return new Promise((resolve, reject) => {
+    const probe = net.createServer();
+    probe.unref();
+    probe.on('error', reject);
+    probe.listen(0, '127.0.0.1', () => {
+      const { port } = probe.address();
+      probe.close(() => resolve(port));
+    });
+  });
+}
+
+// Find Chrome in its default location for this OS, then in other common locations
+function findChromePath() {
+  const defaultPaths = {
+    darwin: '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+    win32: 'C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe',
+    linux: '/usr/bin/google-chrome'
+  };
+  const candidates = [
+    defaultPaths[process.platform],
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+    '/Applications/Google Chrome Canary.app/Contents/MacOS/Google Chrome Canary',
+    '/Applications/Chromium.app/Contents/MacOS/Chromium',
+    '/usr/bin/google-chrome',
+    '/usr/bin/chromium-browser'
+  ];
+  
+  return candidates.find(candidate => candidate && fs.existsSync(candidate)) || '';
+}
+
+// Send a binary screencast frame to every client that has taken the previous
+// ones; frames for clients that are still behind are dropped
+function broadcastFrame(frame) {
+  clients.forEach(client => {
+    if (client.readyState === WebSocket.OPEN && client.bufferedAmount < MAX_CLIENT_BUFFERED_BYTES) {
+      client.send(frame, { binary: true });
+    }
+  });
+}
+
+// Connect to the screencast cli.py publishes with --screencast-port and
+// broadcast its frames (4-byte big-endian length, then JPEG bytes)
+function connectToScreencast(port) {
+  return new Promise((resolve, reject) => {
+    const socket = net.connect({ host: '127.0.0.1', port });
+    let buffer = Buffer.alloc(0);
     
-    console.log(`Attempting to connect to CDP at http://${hostname}:${port}/json/list`);
+    socket.once('connect', () => {
+      console.log(`Connected to screencast on port ${port}`);
+      resolve(socket);
+    });
+    socket.once('error', reject);
     
-    let response;
-    let targets;
+    socket.on('data', (chunk) => {
+      buffer = Buffer.concat([buffer, chunk]);
+      while (buffer.length >= 4) {
+        const length = buffer.readUInt32BE(0);
+        if (buffer.length < 4 + length) break;
+        broadcastFrame(buffer.subarray(4, 4 + length));
+        buffer = buffer.subarray(4 + length);
+      }
+    });
     
-    try {
-      // Try connecting using the hostname
-      response = await axios.get(`http://${hostname}:${port}/json/list`);
-      targets = response.data;
-      console.log(`Successfully connected to CDP using hostname: ${hostname}`);
-    } catch (error) {
-      console.log(`Failed to connect using hostname: ${hostname}. Error: ${error.message}`);
-      console.log(`Trying fallback to localhost...`);
-      
-      // If that fails, try connecting to localhost
-      response = await axios.get(`http://localhost:${port}/json/list`);
-      targets = response.data;
-      console.log(`Successfully connected to CDP using localhost fallback`);
+    socket.on('close', () => console.log(`Screencast on port ${port} closed`));
+  });
+}
+
+// Research server job options for a run, or null when the run needs settings
+// only cli.py takes (a local or existing browser, a proxy, Chromium flags)
+function researchJobOptions(body, { headless, screencastPort }) {
+  const { enableSecurity, connectExisting, useLocalBrowser, chromePath, wssUrl, cdpUrl,
+          extraChromiumArgs, proxy, noStealthMode } = body;
+  
+  if (useLocalBrowser || connectExisting || chromePath || wssUrl || cdpUrl || proxy || enableSecurity ||
+      (extraChromiumArgs && extraChromiumArgs.length > 0)) {
+    return null;
+  }
+  
+  const options = {};
+  if (headless !== null) options.headless = headless;
+  if (noStealthMode) options.stealth_mode = false;
+  if (screencastPort !== null) options.screencast_port = screencastPort;
+  return options;
+}
+
+// Submit a job to the research server; resolves to the job id, or null when
+// the server is not running
+async function submitResearchJob(prompt, options, priority = 0) {
+  try {
+    const response = await axios.post(`${RESEARCH_SERVER_URL}/jobs`, { prompt, options, priority });
+    return response.data.id;
+  } catch (error) {
+    if (error.code === 'ECONNREFUSED') {
+      return null;
+    }
+    throw error;
+  }
+}
+
+// Poll a research server job until it finishes and return its result; gives
+// up after RESEARCH_JOB_TIMEOUT_MS (the job itself keeps running)
+async function waitForResearchJob(jobId) {
+  const deadline = Date.now() + RESEARCH_JOB_TIMEOUT_MS;
+  let lastStatus = null;
+  
+  while (true) {
+    if (Date.now() > deadline) {
+      throw new Error(`Research job ${jobId} did not finish within ${Math.round(RESEARCH_JOB_TIMEOUT_MS / 1000)}s`);
+    }
+
+    const response = await axios.get(`${RESEARCH_SERVER_URL}/jobs/${jobId}/result`, {
+      validateStatus: status => status === 200 || status === 202 || status === 500
+    });
+    const { status, result, error } = response.data;
+    
+    if (status !== lastStatus) {
+      broadcastCliOutput(`Research job ${jobId} is ${status}`);
+      lastStatus = status;
     }
     
-    console.log(`Found ${targets.length} browser targets`);
+    if (status === 'done') return result;
+    if (status === 'failed') throw new Error(error || 'Research job failed');
     
-    if (targets && targets.length > 0) {
-      // Find the first page target
-      const target = targets.find(t => t.type === 'page');
-      if (target) {
-        console.log('Found browser target:', target.title);
-        
-        // Create a WebSocket connection to the target
-        const ws = new WebSocket(target.webSocketDebuggerUrl);
-        
-        // Set up message handler
-        ws.on('message', (message) => {
-          try {
-            const data = JSON.parse(message.toString());
-            
-            // If this is a screenshot response
-            if (data.id === 1 && data.result && data.result.data) {
-              // Broadcast the screenshot to all connected clients
-              clients.forEach(client => {
-                if (client.readyState === WebSocket.OPEN) {
-                  client.send(JSON.stringify({
-                    type: 'screenshot',
-                    data: data.result.data
-                  }));
-                }
-              });
-            }
-          } catch (error) {
-            console.error('Error processing CDP message:', error);
-          }
-        });
-        
-        // When the connection is established
-        ws.on('open', () => {
-          console.log('Connected to Chrome target');
-          
-          // Start capturing screenshots periodically
-          const captureInterval = setInterval(() => {
-            if (ws.readyState === WebSocket.OPEN) {
-              ws.send(JSON.stringify({
-                id: 1,
-                method: 'Page.captureScreenshot',
-                params: { format: 'jpeg', quality: 80 }
-              }));
-            } else {
-              clearInterval(captureInterval);
-            }
-          }, 500); // Capture every 500ms
-        });
-        
-        return target.webSocketDebuggerUrl;
+    await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+}
+
+// Start streaming the research browser's screencast to the embedded view
+function startScreencastFeed(port) {
+  setTimeout(async () => {
+    // cli.py starts listening before it launches the browser; retry while
+    // Python is still starting up
+    const maxRetries = 10;
+    
+    for (let attempt = 1; attempt <= maxRetries; attempt++) {
+      try {
+        await connectToScreencast(port);
+        broadcastCliOutput("Connected to browser screencast");
+        return;
+      } catch (error) {
+        if (attempt < maxRetries) {
+          await new Promise(resolve => setTimeout(resolve, 1000));
+        }
       }
     }
-    throw new Error('No browser targets found');
-  } catch (error) {
-    console.error('Error connecting to CDP:', error.message);
-    return null;
-  }
+    
+    broadcastCliOutput(`Failed to connect to the browser screencast on port ${port}.`);
+  }, 1000);
 }
 
 // Endpoint for the embedded browser
@@ -182,31 +310,37 @@ app.get('/embedded-browser', (req, res) => {
       <script>
         // Create a WebSocket connection to the server
         const socket = new WebSocket('ws://' + window.location.host);
+        socket.binaryType = 'blob';
+        let frameUrl = null;
         
         socket.onopen = function() {
           console.log('WebSocket connection established');
         };
         
         socket.onmessage = function(event) {
-          const data = JSON.parse(event.data);
-          
-          if (data.type === 'screenshot') {
-            // When we receive a screenshot, display it
+          // Binary messages are JPEG screencast frames
+          if (event.data instanceof Blob) {
             const container = document.getElementById('browser-container');
             
-            // If this is the first screenshot, clear the initializing message
+            // If this is the first frame, clear the initializing message
             if (!document.getElementById('browser-display')) {
               container.innerHTML = '<img id="browser-display" src="" alt="Browser content" />';
             }
             
-            // Update the screenshot
+            // Show the frame and release the previous one
             const img = document.getElementById('browser-display');
-            img.src = 'data:image/jpeg;base64,' + data.data;
+            if (frameUrl) URL.revokeObjectURL(frameUrl);
+            frameUrl = URL.createObjectURL(new Blob([event.data], { type: 'image/jpeg' }));
+            img.src = frameUrl;
+            return;
           }
-          else if (data.type === 'cli-output') {
-            // Forward CLI output to parent window
+          
+          const data = JSON.parse(event.data);
+          
+          if (data.type === 'cli-output' || data.type === 'run-event') {
+            // Forward CLI output and run events to parent window
             window.parent.postMessage({
-              type: 'cli-output',
+              type: data.type,
               data: data.data
             }, '*');
           }
@@ -246,6 +380,12 @@ app.post('/api/run-research', async (req, res) => {
     return res.status(400).json({ error: 'Prompt is required' });
   }
 
+  // cli.py publishes the browser's screencast on a port of its own for each
+  // run, so simultaneous runs don't collide. It also picks free remote
+  // debugging ports itself.
+  const showBrowser = Boolean(req.body.useEmbeddedBrowser || useLocalBrowser);
+  const screencastPort = showBrowser ? await getFreePort() : null;
+
   // Build the command arguments
   const args = ['../cli.py'];
   
@@ -269,27 +409,29 @@ app.post('/api/run-research', async (req, res) => {
     });
   }
   
+  // Headless decision passed on with the run: null leaves it to the flags
+  // above (cli.py) or the research server's own setting
+  let headless = noHeadless ? false : null;
+  let cliEnv = process.env;
+  
   // If using embedded browser and not using local browser, add a special flag
   if (req.body.useEmbeddedBrowser && !useLocalBrowser) {
     args.push('--embedded-browser');
     
-    // Add additional arguments for embedded browser as a single string
-    if (!extraChromiumArgs || !extraChromiumArgs.some(arg => arg.includes('remote-debugging-port'))) {
-      args.push('--chromium-arg=--remote-debugging-port=9222');
-    }
-    
     if (!extraChromiumArgs || !extraChromiumArgs.some(arg => arg === '--no-sandbox')) {
       args.push('--chromium-arg=--no-sandbox');
     }
     
-    // Set SERVER_ENVIRONMENT to true if running on a server without a display
-    // This will force headless mode in cli.py
+    // On a server without a display the browser has to run headless; the
+    // screencast shows the page either way
     const isServer = process.env.NODE_ENV === 'production' || 
                     !process.env.DISPLAY || 
                     process.env.SERVER_ENVIRONMENT === 'true';
                     
     if (isServer) {
-      process.env.SERVER_ENVIRONMENT = 'true';
+      headless = true;
+      // This forces headless mode in a spawned cli.py
+      cliEnv = { ...process.env, SERVER_ENVIRONMENT: 'true' };
     }
   }
   
@@ -297,129 +439,70 @@ app.post('/api/run-research', async (req, res) => {
   if (useLocalBrowser) {
     args.push('--connect-existing');
     
-    // If chrome path is not provided, try to use a default path based on OS
-    let defaultChromePath = '';
+    // If chrome path is not provided, look for Chrome in the usual locations
     if (!chromePath) {
-      const platform = process.platform;
-      
-      if (platform === 'darwin') {
-        // macOS
-        defaultChromePath = '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome';
-      } else if (platform === 'win32') {
-        // Windows
-        defaultChromePath = 'C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe';
-      } else if (platform === 'linux') {
-        // Linux
-        defaultChromePath = '/usr/bin/google-chrome';
-      }
-      
+      const defaultChromePath = findChromePath();
       if (defaultChromePath) {
+        broadcastCliOutput(`Using Chrome at: ${defaultChromePath}`);
         args.push('--chrome-path', defaultChromePath);
+      } else {
+        broadcastCliOutput(`ERROR: Could not find Chrome in any common location. Please specify the path manually.`);
       }
     }
-    
-    // Add remote debugging port if not already specified
-    if (!extraChromiumArgs || !extraChromiumArgs.some(arg => arg.includes('remote-debugging-port'))) {
-      args.push('--chromium-arg=--remote-debugging-port=9222');
-    }
-    
-    // When using local browser, we need to start Chrome with remote debugging enabled
-    // before running the Python script
-    const actualChromePath = chromePath || defaultChromePath;
-    if (actualChromePath) {
+  }
+  
+  if (showBrowser) {
+    args.push('--screencast-port', String(screencastPort));
+  }
+
+  // Prefer the research server, which bounds how many runs happen at once
+  // and reuses its warm browsers
+  const jobOptions = researchJobOptions(req.body, { headless, screencastPort });
+  try {
+    const jobId = jobOptions && await submitResearchJob(prompt, jobOptions);
+    if (jobId) {
+      broadcastCliOutput(`Starting research: "${prompt}"`);
+      broadcastCliOutput(`Submitted research job ${jobId}`);
+      
+      if (showBrowser) {
+        startScreencastFeed(screencastPort);
+      }
+      
+      let output;
       try {
-        broadcastCliOutput(`Starting Chrome at: ${actualChromePath}`);
-        
-        // Start Chrome with remote debugging
-        const chromeArgs = [
-          '--remote-debugging-port=9222',
-          '--no-first-run',
-          '--no-default-browser-check',
-          '--user-data-dir=./ChromeUserData'
-        ];
-        
-        // Add any extra args
-        if (extraChromiumArgs) {
-          extraChromiumArgs.forEach(arg => {
-            if (!arg.includes('remote-debugging-port')) {
-              chromeArgs.push(arg);
-            }
-          });
-        }
-        
-        // Log the Chrome path and arguments for debugging
-        broadcastCliOutput(`Chrome path: ${actualChromePath}`);
-        broadcastCliOutput(`Chrome args: ${chromeArgs.join(' ')}`);
-        
-        // Check if the Chrome executable exists
-        if (!fs.existsSync(actualChromePath)) {
-          broadcastCliOutput(`ERROR: Chrome executable not found at ${actualChromePath}`);
-          broadcastCliOutput(`Checking for Chrome in other common locations...`);
-          
-          // Try some alternative locations
-          const alternativePaths = [
-            '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
-            '/Applications/Google Chrome Canary.app/Contents/MacOS/Google Chrome Canary',
-            '/Applications/Chromium.app/Contents/MacOS/Chromium',
-            '/usr/bin/google-chrome',
-            '/usr/bin/chromium-browser'
-          ];
-          
-          let found = false;
-          let foundPath = '';
-          
-          for (const path of alternativePaths) {
-            if (fs.existsSync(path)) {
-              broadcastCliOutput(`Found Chrome at: ${path}`);
-              foundPath = path;
-              found = true;
-              break;
-            }
-          }
-          
-          if (!found) {
-            broadcastCliOutput(`ERROR: Could not find Chrome in any common location. Please specify the path manually.`);
-            throw new Error(`Chrome executable not found at ${actualChromePath} or any common location`);
-          }
-          
-          // Use the found path
-          actualChromePath = foundPath;
-        }
-        
-        // Start Chrome process
-        const chromeProcess = spawn(actualChromePath, chromeArgs, {
-          detached: true, // Run in background
-          stdio: 'pipe' // Capture output for debugging
-        });
-        
-        // Capture and log any output from Chrome for debugging
-        chromeProcess.stdout.on('data', (data) => {
-          broadcastCliOutput(`Chrome stdout: ${data.toString()}`);
-        });
-        
-        chromeProcess.stderr.on('data', (data) => {
-          broadcastCliOutput(`Chrome stderr: ${data.toString()}`);
-        });
-        
-        chromeProcess.on('error', (err) => {
-          broadcastCliOutput(`ERROR starting Chrome: ${err.message}`);
-          console.error('Error starting Chrome:', err);
-        });
-        
-        // Don't wait for the Chrome process to exit
-        chromeProcess.unref();
-        
-        broadcastCliOutput(`Chrome started with remote debugging on port 9222`);
-        
-        // Wait a moment for Chrome to initialize
-        await new Promise(resolve => setTimeout(resolve, 3000));
+        output = await waitForResearchJob(jobId);
       } catch (error) {
-        console.error('Error starting Chrome:', error);
-        broadcastCliOutput(`Error starting Chrome: ${error.message}`);
+        broadcastRunEvent({ event: 'end', run_id: jobId, status: 'error' });
+        throw error;
       }
+      broadcastCliOutput(output);
+      broadcastRunEvent({ event: 'end', run_id: jobId, status: 'ok' });
+      return res.json({ success: true, output, jobId });
     }
+    if (jobOptions) {
+      console.log(`Research server not running at ${RESEARCH_SERVER_URL}, spawning cli.py`);
+    }
+  } catch (error) {
+    if (error.response && error.response.status === 429) {
+      broadcastCliOutput('Research server is busy, please try again later');
+      return res.status(503).json({ success: false, error: error.response.data.error });
+    }
+    broadcastCliOutput(`ERROR: ${error.message}`);
+    return res.status(500).json({ success: false, error: error.message });
   }
 
+  // Each cli.py run launches its own browser, so only a few run at once
+  if (cliRuns >= MAX_CLI_RUNS) {
+    broadcastCliOutput('Too many research runs in progress, please try again later');
+    return res.status(503).json({
+      success: false,
+      error: `At most ${MAX_CLI_RUNS} research runs can be in progress at once`
+    });
+  }
+  
+  // Progress and the result come back as NDJSON events on stdout
+  args.push('--events', 'ndjson');
+  
   console.log('Running command: python3', args.join(' '));
   
   // Send initial CLI output to clients
@@ -427,106 +510,93 @@ app.post('/api/run-research', async (req, res) => {
   broadcastCliOutput(`Command: python3 ${args.join(' ')}`);
   
   // Spawn the Python process
-  const pythonProcess = spawn('python3', args);
+  const pythonProcess = spawn('python3', args, { env: cliEnv });
+  cliRuns++;
+  let cliRunCounted = true;
+  const finishCliRun = () => {
+    if (cliRunCounted) {
+      cliRunCounted = false;
+      cliRuns--;
+    }
+  };
   
-  let dataOutput = '';
+  let stdoutBuffer = '';
   let errorOutput = '';
+  let resultEvent = null;
+  let errorEvent = null;
+  let endEvent = null;
   
-  // Always try to connect to CDP for screenshots, whether using embedded or local browser
-  if (req.body.useEmbeddedBrowser || useLocalBrowser) {
-    // Wait a moment for the browser to start
-    setTimeout(async () => {
-      // For local browser, we need to wait longer and retry a few times
-      const maxRetries = useLocalBrowser ? 5 : 1;
-      let retryCount = 0;
-      let connected = false;
-      
-      while (retryCount < maxRetries && !connected) {
-        try {
-          // This will start the screenshot capture process
-          broadcastCliOutput(`Connecting to browser for screenshots (attempt ${retryCount + 1}/${maxRetries})...`);
-          await connectToCDP(9222);
-          broadcastCliOutput("Connected to browser for screenshots");
-          connected = true;
-          
-          // If we're running in headless mode on a server, let the user know
-          if (process.env.SERVER_ENVIRONMENT === 'true') {
-            broadcastCliOutput("Running in headless mode on server. Screenshots will be captured and displayed.");
-          } else if (useLocalBrowser) {
-            broadcastCliOutput("Connected to local browser. Screenshots will be captured and displayed in the iframe.");
-          }
-        } catch (error) {
-          console.error(`Error connecting to browser (attempt ${retryCount + 1}/${maxRetries}):`, error);
-          broadcastCliOutput(`Error connecting to browser: ${error.message}`);
-          
-          if (retryCount < maxRetries - 1) {
-            broadcastCliOutput(`Retrying in 3 seconds...`);
-            // Wait 3 seconds before retrying
-            await new Promise(resolve => setTimeout(resolve, 3000));
-          }
-          
-          retryCount++;
-        }
-      }
-      
-      if (!connected) {
-        broadcastCliOutput("Failed to connect to browser after multiple attempts.");
-        
-        // If we're running on a server, provide additional troubleshooting info
-        if (process.env.SERVER_ENVIRONMENT === 'true') {
-          broadcastCliOutput("Note: When running on a Linux server without a display, the browser runs in headless mode.");
-          broadcastCliOutput("Screenshots should still be captured and displayed in the iframe.");
-          broadcastCliOutput("If no screenshots appear, check that the browser is properly initialized with --headless=new flag.");
-        } else if (useLocalBrowser) {
-          broadcastCliOutput("Make sure Chrome is running with remote debugging enabled on port 9222.");
-          broadcastCliOutput("You can manually start Chrome with: chrome --remote-debugging-port=9222");
-        }
-      }
-    }, useLocalBrowser ? 5000 : 3000); // Wait longer for local browser
+  // Stream the browser's screencast, whether using embedded or local browser
+  if (showBrowser) {
+    startScreencastFeed(screencastPort);
   }
 
-  // Collect data from stdout
+  // stdout carries one JSON event per line
   pythonProcess.stdout.on('data', (data) => {
-    const output = data.toString();
-    console.log('Output:', output);
-    dataOutput += output;
+    stdoutBuffer += data.toString();
+    const lines = stdoutBuffer.split('\n');
+    stdoutBuffer = lines.pop();
+    if (stdoutBuffer.length > MAX_EVENT_LINE_CHARS) {
+      console.error(`Dropping an event line longer than ${MAX_EVENT_LINE_CHARS} characters`);
+      stdoutBuffer = '';
+    }
     
-    // Broadcast the output to all connected clients
-    broadcastCliOutput(output);
+    lines.filter(line => line.trim()).forEach(line => {
+      let event;
+      try {
+        event = JSON.parse(line);
+      } catch (error) {
+        console.error('Ignoring malformed event line:', line);
+        return;
+      }
+      console.log('Event:', line);
+      
+      if (event.event === 'result') resultEvent = event;
+      else if (event.event === 'error') errorEvent = event;
+      else if (event.event === 'end') endEvent = event;
+      
+      // Broadcast the event and a readable line to all connected clients
+      broadcastRunEvent(event);
+      broadcastCliOutput(formatRunEvent(event));
+    });
   });
 
-  // Collect data from stderr
+  // stderr carries the free-text progress output and logs
   pythonProcess.stderr.on('data', (data) => {
-    const error = data.toString();
-    console.error('Error:', error);
-    errorOutput += error;
+    const output = data.toString();
+    console.log('Output:', output);
+    errorOutput = (errorOutput + output).slice(-MAX_ERROR_OUTPUT_CHARS);
     
-    // Broadcast the error to all connected clients
-    broadcastCliOutput(`ERROR: ${error}`);
+    // Broadcast the output to all connected clients
+    broadcastCliOutput(output);
   });
 
   // Handle process completion
   pythonProcess.on('close', (code) => {
+    finishCliRun();
     console.log(`Process exited with code ${code}`);
     
     // Broadcast process completion
     broadcastCliOutput(`Process completed with exit code: ${code}`);
     
-    if (code === 0) {
+    // An incomplete run still has the agent's last answer
+    if (code === 0 && resultEvent && endEvent && ['ok', 'incomplete'].includes(endEvent.status)) {
       res.json({ 
         success: true, 
-        output: dataOutput 
+        output: resultEvent.text,
+        runId: resultEvent.run_id
       });
     } else {
       res.status(500).json({ 
         success: false, 
-        error: errorOutput || 'An error occurred while running the script' 
+        error: (errorEvent && errorEvent.message) || errorOutput || 'An error occurred while running the script' 
       });
     }
   });
 
   // Handle process errors
   pythonProcess.on('error', (err) => {
+    finishCliRun();
     console.error('Failed to start process:', err);
     
     // Broadcast process error
@@ -539,6 +609,43 @@ app.post('/api/run-research', async (req, res) => {
   });
 });
 
+// Submit a research job without waiting for it to finish
+app.post('/api/research-jobs', async (req, res) => {
+  const { prompt, options, priority } = req.body;
+  
+  if (!prompt) {
+    return res.status(400).json({ error: 'Prompt is required' });
+  }
+  
+  const unknown = Object.keys(options || {}).filter(name => !RESEARCH_JOB_OPTIONS.includes(name));
+  if (unknown.length > 0) {
+    return res.status(400).json({ error: `Unknown options: ${unknown.join(', ')}` });
+  }
+  
+  try {
+    const response = await axios.post(`${RESEARCH_SERVER_URL}/jobs`, { prompt, options, priority }, {
+      validateStatus: () => true
+    });
+    res.status(response.status).json(response.data);
+  } catch (error) {
+    res.status(503).json({ error: `Research server unavailable: ${error.message}` });
+  }
+});
+
+// Status and result of a submitted research job
+app.get(['/api/research-jobs/:id', '/api/research-jobs/:id/result'], async (req, res) => {
+  const suffix = req.path.endsWith('/result') ? '/result' : '';
+  
+  try {
+    const response = await axios.get(`${RESEARCH_SERVER_URL}/jobs/${encodeURIComponent(req.params.id)}${suffix}`, {
+      validateStatus: () => true
+    });
+    res.status(response.status).json(response.data);
+  } catch (error) {
+    res.status(503).json({ error: `Research server unavailable: ${error.message}` });
+  }
+});
+
 // Serve the React app for any other routes
 app.get('*', (req, res) => {
   res.sendFile(path.join(__dirname, 'build', 'index.html'));
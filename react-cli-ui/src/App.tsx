@@ -21,6 +21,19 @@ interface CliOutput {
   timestamp: number;
 }
 
+// Structured event from cli.py --events ndjson, forwarded by the server
+interface RunEvent {
+  event: 'start' | 'step' | 'result' | 'error' | 'end';
+  run_id: string;
+  // end: incomplete when the agent stopped before finishing the task
+  status?: 'ok' | 'incomplete' | 'error';
+  // result: whether the agent finished the task
+  done?: boolean;
+}
+
+// Older CLI output lines are dropped so long runs don't grow the page
+const MAX_CLI_OUTPUT_LINES = 2000;
+
 function App() {
   const [formData, setFormData] = useState<FormData>({
     prompt: '',
@@ -59,12 +72,11 @@ function App() {
       // Check if the message is from our iframe
       if (event.data && event.data.type === 'cli-output') {
         addCliOutput(event.data.data);
-        
-        // Check if the task is completed
-        if (event.data.data.includes("Task completed successfully") || 
-            event.data.data.includes("Research task completed.")) {
-          setTaskCompleted(true);
-        }
+      }
+      
+      // The run's end event marks the task as completed
+      if (event.data && event.data.type === 'run-event' && (event.data.data as RunEvent).event === 'end') {
+        setTaskCompleted(true);
       }
     };
     
@@ -113,7 +125,7 @@ function App() {
 
   // Function to add CLI output
   const addCliOutput = (text: string) => {
-    setCliOutput(prev => [...prev, { text, timestamp: Date.now() }]);
+    setCliOutput(prev => [...prev.slice(-(MAX_CLI_OUTPUT_LINES - 1)), { text, timestamp: Date.now() }]);
   };
 
   const handleSubmit = async (e: React.FormEvent) => {
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Long-lived research job server.
+
+Keeps the Python interpreter, its imports and a warm browser pool alive
+between requests. Jobs are submitted over local HTTP, wait in a bounded
+priority queue, and are run by a fixed number of workers, so load never
+starts more browsers than there are workers.
+
+Endpoints:
+    POST /jobs               Submit {"prompt": ..., "priority": 0, "options": {...}}
+                             as application/json
+    GET  /jobs/{id}          Job status
+    GET  /jobs/{id}/result   Job result (202 while the job is still pending)
+    GET  /health             Queue and worker counters
+"""
+import argparse
+import asyncio
+import itertools
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from aiohttp import web
+
+from browser_pool import BrowserPool
+from cli import build_browser_config, run_research
+from http_cache import HttpCache
+from network_profiles import NETWORK_PROFILES, build_network_profile
+
+# run_research options a job may set. Executables, Chromium flags and
+# directories come only from the server's own command line, since any local
+# web page can post to the server.
+JOB_OPTIONS = {'headless', 'stealth_mode', 'net_profile', 'screencast_port'}
+
+# Job options that need a dedicated browser when they differ from the pool's;
+# a screencast follows the lease's context instead
+DEDICATED_OPTIONS = {'headless', 'stealth_mode', 'net_profile'}
+
+def validate_options(options) -> Optional[str]:
+    """
+    Return why job options are not acceptable, or None when they are.
+    """
+    if not isinstance(options, dict):
+        return 'Options must be an object'
+    unknown = set(options) - JOB_OPTIONS
+    if unknown:
+        return f"Unknown options: {', '.join(sorted(unknown))}"
+    for name in ('headless', 'stealth_mode'):
+        if name in options and not isinstance(options[name], bool):
+            return f"Option {name} must be true or false"
+    if 'net_profile' in options and options['net_profile'] not in NETWORK_PROFILES:
+        return f"Option net_profile must be one of: {', '.join(sorted(NETWORK_PROFILES))}"
+    port = options.get('screencast_port')
+    if port is not None and (isinstance(port, bool) or not isinstance(port, int) or not 0 <= port <= 65535):
+        return 'Option screencast_port must be a port number'
+    return None
+
+class Job:
+    """
+    A submitted research job and its lifecycle timestamps.
+    """
+    def __init__(self, prompt: str, priority: int = 0, options: Optional[dict] = None):
+        self.id = uuid.uuid4().hex
+        self.prompt = prompt
+        self.priority = priority
+        self.options = options or {}
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'priority': self.priority,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error
+        }
+
+class ResearchServer:
+    """
+    Bounded priority queue of research jobs served by a fixed set of workers.
+    """
+    def __init__(
+        self,
+        pool: BrowserPool,
+        workers: int = 2,
+        max_queue: int = 100,
+        max_finished: int = 1000,
+        history_dir: Optional[str] = None,
+        browser_options: Optional[dict] = None
+    ):
+        """
+        Args:
+            pool: Warm browser pool used by jobs whose options it can serve
+            workers: Number of jobs that run at the same time
+            max_queue: Number of queued jobs after which submissions are rejected
+            max_finished: Number of finished jobs kept for status/result lookups
+            history_dir: Move each job's screenshots and large extracted
+                content to history_dir/<job id> instead of keeping them in memory
+            browser_options: run_research browser options the pool was built
+                with; jobs that need a dedicated browser start from these
+        """
+        self.pool = pool
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self.history_dir = history_dir
+        self.browser_options = browser_options or {}
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self.jobs = OrderedDict()
+        self.running = 0
+        self._sequence = itertools.count()
+        self._worker_tasks = []
+
+    def submit(self, prompt: str, priority: int = 0, options: Optional[dict] = None) -> Optional[Job]:
+        """
+        Queue a job, or return None when the queue is full.
+
+        Lower priority values run first; equal priorities run in submission order.
+        """
+        if self.queue.qsize() >= self.max_queue:
+            return None
+        job = Job(prompt, priority, options)
+        self.jobs[job.id] = job
+        self.queue.put_nowait((priority, next(self._sequence), job.id))
+        return job
+
+    def _forget_finished(self):
+        """
+        Drop the oldest finished jobs beyond max_finished.
+        """
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def needs_dedicated_browser(self, options: dict) -> bool:
+        """
+        Whether job options ask for a browser set up differently from the pooled ones.
+        """
+        defaults = {'headless': True, 'stealth_mode': True, 'net_profile': 'full', **self.browser_options}
+        return any(options[name] != defaults[name] for name in DEDICATED_OPTIONS & set(options))
+
+    async def _worker(self, worker_id: int):
+        """
+        Run queued jobs one at a time until cancelled.
+        """
+        while True:
+            _, _, job_id = await self.queue.get()
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            job.status = 'running'
+            job.started_at = time.time()
+            self.running += 1
+            try:
+                history = dict(history_dir=self.history_dir, run_id=job.id)
+                if self.needs_dedicated_browser(job.options):
+                    options = {**self.browser_options, **job.options}
+                    job.result = await run_research(job.prompt, **history, **options)
+                else:
+                    async with self.pool.lease() as lease:
+                        job.result = await run_research(job.prompt, lease=lease, **history,
+                                                        screencast_port=job.options.get('screencast_port'))
+                job.status = 'done'
+            except Exception as e:
+                job.status = 'failed'
+                job.error = str(e)
+                print(f"Job {job.id} failed on worker {worker_id}: {e}")
+            finally:
+                self.running -= 1
+                job.finished_at = time.time()
+                self._forget_finished()
+
+    def start(self):
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+
+    # HTTP handlers
+
+    async def handle_submit(self, request: web.Request) -> web.Response:
+        # Browsers send cross-site form and text/plain posts without a
+        # preflight; requiring JSON keeps other web pages from submitting jobs
+        if request.content_type != 'application/json':
+            return web.json_response({'error': 'Content-Type must be application/json'}, status=415)
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.json_response({'error': 'Request body must be JSON'}, status=400)
+        if not isinstance(body, dict):
+            return web.json_response({'error': 'Request body must be a JSON object'}, status=400)
+
+        prompt = body.get('prompt')
+        if not isinstance(prompt, str) or not prompt.strip():
+            return web.json_response({'error': 'Prompt is required'}, status=400)
+        try:
+            priority = int(body.get('priority', 0))
+        except (TypeError, ValueError):
+            return web.json_response({'error': 'Priority must be an integer'}, status=400)
+        options = body.get('options', {})
+        error = validate_options(options)
+        if error:
+            return web.json_response({'error': error}, status=400)
+
+        job = self.submit(prompt, priority, options)
+        if job is None:
+            return web.json_response(
+                {'error': 'Research queue is full, try again later'},
+                status=429,
+                headers={'Retry-After': '30'}
+            )
+        return web.json_response(
+            {'id': job.id, 'status': job.status, 'queued': self.queue.qsize()}, status=202
+        )
+
+    def _get_job(self, request: web.Request) -> Job:
+        job = self.jobs.get(request.match_info['job_id'])
+        if job is None:
+            raise web.HTTPNotFound(
+                text='{"error": "Unknown job"}', content_type='application/json'
+            )
+        return job
+
+    async def handle_status(self, request: web.Request) -> web.Response:
+        return web.json_response(self._get_job(request).to_dict())
+
+    async def handle_result(self, request: web.Request) -> web.Response:
+        job = self._get_job(request)
+        if job.status == 'done':
+            return web.json_response({'id': job.id, 'status': job.status, 'result': job.result})
+        if job.status == 'failed':
+            return web.json_response(
+                {'id': job.id, 'status': job.status, 'error': job.error}, status=500
+            )
+        return web.json_response({'id': job.id, 'status': job.status}, status=202)
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'workers': self.workers,
+            'running': self.running,
+            'queued': self.queue.qsize(),
+            'max_queue': self.max_queue
+        })
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/jobs', self.handle_submit)
+        app.router.add_get('/jobs/{job_id}', self.handle_status)
+        app.router.add_get('/jobs/{job_id}/result', self.handle_result)
+        app.router.add_get('/health', self.handle_health)
+        return app
+
+async def serve(args):
+    browser_options = dict(
+        headless=not args.no_headless,
+        stealth_mode=not args.no_stealth_mode,
+        net_profile=args.net_profile,
+        extra_chromium_args=args.extra_chromium_args,
+        http_cache_dir=args.http_cache
+    )
+    config = build_browser_config(
+        headless=browser_options['headless'],
+        extra_chromium_args=args.extra_chromium_args
+    )
+    http_cache = HttpCache(args.http_cache) if args.http_cache else None
+    try:
+        async with BrowserPool(
+            config,
+            size=args.workers,
+            stealth_mode=browser_options['stealth_mode'],
+            max_tasks_per_browser=args.max_tasks_per_browser,
+            max_rss_mb=args.max_rss_mb,
+            network_profile=build_network_profile(args.net_profile),
+            http_cache=http_cache
+        ) as pool:
+            server = ResearchServer(pool, workers=args.workers, max_queue=args.max_queue,
+                                    history_dir=args.history_dir, browser_options=browser_options)
+            server.start()
+            runner = web.AppRunner(server.make_app())
+            await runner.setup()
+            if args.socket:
+                site = web.UnixSite(runner, args.socket)
+                where = args.socket
+            else:
+                site = web.TCPSite(runner, args.host, args.port)
+                where = f"http://{args.host}:{args.port}"
+            await site.start()
+            print(f"Research server listening on {where} with {args.workers} worker(s)")
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await server.stop()
+                await runner.cleanup()
+    finally:
+        if http_cache is not None:
+            http_cache.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Research job server')
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                        help='Host to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='Port to listen on (default: 8765)')
+    parser.add_argument('--socket', type=str,
+                        help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='Number of jobs run at once, and warm browsers kept (default: 2)')
+    parser.add_argument('--max-queue', type=int, default=100,
+                        help='Reject submissions once this many jobs are queued (default: 100)')
+    parser.add_argument('--max-tasks-per-browser', type=int, default=50,
+                        help='Relaunch a pooled browser after this many tasks (default: 50)')
+    parser.add_argument('--max-rss-mb', type=float,
+                        help='Relaunch pooled browsers when their combined RSS exceeds this many MB')
+    parser.add_argument('--no-headless', action='store_true',
+                        help='Run pooled browsers visible (default: headless/invisible)')
+    parser.add_argument('--no-stealth-mode', action='store_true',
+                        help='Disable stealth mode for pooled browsers')
+    parser.add_argument('--net-profile', choices=sorted(NETWORK_PROFILES), default='full',
+                        help='Network profile for pooled browsers (default: full)')
+    parser.add_argument('--http-cache', type=str, metavar='DIR',
+                        help='Persistent HTTP cache directory shared by pooled browsers')
+    parser.add_argument('--history-dir', type=str, metavar='DIR',
+                        help='Move each job\'s screenshots and large extracted content to DIR/<job id> '
+                             'to keep memory flat')
+    parser.add_argument('--chromium-arg', action='append', dest='extra_chromium_args',
+                        help='Extra arguments to pass to every browser the server starts (can be used multiple times)')
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\nResearch server stopped.")
+
+if __name__ == "__main__":
+    main()
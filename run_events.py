@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Structured NDJSON event stream for research runs.
+
+With `cli.py --events ndjson`, stdout carries one JSON record per line and
+nothing else (regular output goes to stderr). Every record has `event`,
+`run_id` and `ts` (Unix time), plus:
+
+    start   prompt, model
+    step    step, actions, url, llm_s, prompt_tokens, completion_tokens,
+            action_s, page_load_ms, duration_s, errors
+    result  text, steps, done, duration_s
+    error   message
+    end     status ("ok", "incomplete" or "error"), duration_s
+
+`done` and the "incomplete" status mean the agent stopped without finishing
+the task (max steps or too many failed steps); its checkpoint, if any, is kept.
+
+`page_load_ms` is the navigation timing of the page the step ended on, and
+is null when the step didn't navigate.
+"""
+import json
+import logging
+import sys
+import time
+import uuid
+from contextlib import contextmanager, redirect_stdout
+from typing import List, Optional, TextIO
+
+from browser_use import Agent
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Load time of the current document, from its navigation timing entry
+PAGE_LOAD_JS = """() => {
+    const [nav] = performance.getEntriesByType('navigation');
+    return nav && nav.loadEventEnd > 0 ? nav.loadEventEnd - nav.startTime : null;
+}"""
+
+class EventStream:
+    """
+    Writes typed run events as NDJSON records.
+    """
+    def __init__(self, out: TextIO = None, run_id: str = None):
+        self.out = out or sys.stdout
+        self.run_id = run_id or uuid.uuid4().hex
+
+    def emit(self, event: str, **fields):
+        record = {'event': event, 'run_id': self.run_id, 'ts': round(time.time(), 3), **fields}
+        self.out.write(json.dumps(record, default=str) + '\n')
+        self.out.flush()
+
+@contextmanager
+def stdout_reserved_for_events():
+    """
+    Send prints and stdout log handlers to stderr while the block runs, so
+    an EventStream created on sys.stdout beforehand is the only writer.
+    """
+    moved = []
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values()
+        if isinstance(logger, logging.Logger)
+    ]
+    for logger in loggers:
+        for handler in logger.handlers:
+            if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                handler.setStream(sys.stderr)
+                moved.append(handler)
+    try:
+        with redirect_stdout(sys.stderr):
+            yield
+    finally:
+        for handler in moved:
+            handler.setStream(sys.stdout)
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """
+    Adds up the tokens of the LLM calls made since the last reset.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get('token_usage') or {}
+        if usage:
+            self.prompt_tokens += usage.get('prompt_tokens', 0) or 0
+            self.completion_tokens += usage.get('completion_tokens', 0) or 0
+            return
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, 'message', None), 'usage_metadata', None) or {}
+                self.prompt_tokens += metadata.get('input_tokens', 0)
+                self.completion_tokens += metadata.get('output_tokens', 0)
+
+class EventedAgent(Agent):
+    """
+    Agent that emits a `step` event with its timings after every step.
+    """
+    def __init__(self, *args, events: EventStream, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.events = events
+        self.usage = TokenUsageCallback()
+        self.llm.callbacks = list(self.llm.callbacks or []) + [self.usage]
+        self._step: dict = {}
+
+    async def _current_url(self) -> Optional[str]:
+        try:
+            page = await self.browser_context.get_current_page()
+            return page.url
+        except Exception:
+            return None
+
+    async def _page_load_ms(self) -> Optional[float]:
+        try:
+            page = await self.browser_context.get_current_page()
+            load_ms = await page.evaluate(PAGE_LOAD_JS)
+        except Exception:
+            return None
+        return round(load_ms, 1) if load_ms is not None else None
+
+    async def get_next_action(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().get_next_action(*args, **kwargs)
+        finally:
+            self._step['llm_s'] = round(self._step.get('llm_s', 0.0) + time.perf_counter() - started, 3)
+
+    async def multi_act(self, actions, *args, **kwargs):
+        self._step['actions'] = [
+            name for action in actions for name in action.model_dump(exclude_unset=True)
+        ]
+        started = time.perf_counter()
+        try:
+            return await super().multi_act(actions, *args, **kwargs)
+        finally:
+            self._step['action_s'] = round(time.perf_counter() - started, 3)
+
+    async def step(self, *args, **kwargs):
+        number = self.n_steps
+        self._step = {}
+        self.usage.reset()
+        url_before = await self._current_url()
+        started = time.perf_counter()
+        try:
+            return await super().step(*args, **kwargs)
+        finally:
+            duration_s = round(time.perf_counter() - started, 3)
+            url = await self._current_url()
+            errors: List[str] = [
+                str(r.error) for r in (getattr(self, '_last_result', None) or []) if getattr(r, 'error', None)
+            ]
+            self.events.emit(
+                'step',
+                step=number,
+                actions=self._step.get('actions', []),
+                url=url,
+                llm_s=self._step.get('llm_s'),
+                prompt_tokens=self.usage.prompt_tokens,
+                completion_tokens=self.usage.completion_tokens,
+                action_s=self._step.get('action_s'),
+                page_load_ms=await self._page_load_ms() if url != url_before else None,
+                duration_s=duration_s,
+                errors=errors
+            )
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Change-driven screencast of the agent's page, published over a local socket.
+
+Frames come from the DevTools Page.startScreencast API, which only produces
+a frame when the page repaints. Each frame is sent to every connected client
+as a 4-byte big-endian length followed by the JPEG bytes.
+
+- Identical consecutive frames are skipped.
+- Each client has a single pending-frame slot. A client that hasn't finished
+  receiving the previous frame gets the newest one and the older frame is
+  dropped, so one slow client never holds back the others.
+- When clients drop frames, quality and frame rate step down; after a quiet
+  period they step back up. The frame rate is capped by pacing the frame
+  acks, since Chrome sends the next frame only after the previous one is
+  acknowledged.
+- The screencast follows the page the agent is on and only runs while at
+  least one client is connected.
+"""
+import asyncio
+import base64
+import hashlib
+import struct
+import time
+from typing import Optional, Set
+
+# (JPEG quality, max frames per second), best first
+QUALITY_LEVELS = [(80, 10.0), (60, 5.0), (40, 2.0)]
+
+# Seconds between checks of which page the agent is on
+FOLLOW_INTERVAL_S = 0.25
+
+# Seconds between two steps down, and without drops before a step up
+STEP_DOWN_S = 2.0
+STEP_UP_S = 10.0
+
+class ScreencastClient:
+    """
+    A connected client with a single pending-frame slot.
+    """
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.pending: Optional[bytes] = None
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, frame: bytes):
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = frame
+        self.ready.set()
+
+    async def run(self):
+        """
+        Send pending frames until the client disconnects.
+        """
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                frame, self.pending = self.pending, None
+                self.writer.write(struct.pack('>I', len(frame)) + frame)
+                await self.writer.drain()
+                self.sent += 1
+        except (ConnectionError, OSError):
+            pass
+
+class ScreencastPublisher:
+    """
+    Streams the screencast of a browser context's current page to local
+    socket clients.
+    """
+    def __init__(self, port: int = 0, host: str = '127.0.0.1',
+                 max_width: int = 1280, max_height: int = 800):
+        """
+        Args:
+            port: TCP port to listen on; 0 picks a free one
+            host: Interface to listen on
+            max_width: Maximum frame width in pixels
+            max_height: Maximum frame height in pixels
+        """
+        self.host = host
+        self.port = port
+        self.max_width = max_width
+        self.max_height = max_height
+        self.clients: Set[ScreencastClient] = set()
+        self.level = 0
+        self.frames = 0
+        self.duplicates = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._follow_task: Optional[asyncio.Task] = None
+        self._page = None
+        self._cdp = None
+        self._running = False
+        self._last_frame: Optional[bytes] = None
+        self._last_digest: Optional[bytes] = None
+        self._last_ack = 0.0
+        self._drops_seen = 0
+        self._level_changed = 0.0
+        self._last_drop = 0.0
+        self._lock = asyncio.Lock()
+        # Frame and restart tasks, kept so they aren't garbage collected mid-run
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._on_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"Screencast on {self.host}:{self.port}")
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _on_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = ScreencastClient(writer)
+        self.clients.add(client)
+        if self._last_frame is not None:
+            client.offer(self._last_frame)
+        await self._update()
+        sender = asyncio.create_task(client.run())
+        try:
+            # Clients never send anything; EOF means they went away
+            await reader.read()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            sender.cancel()
+            self.clients.discard(client)
+            writer.close()
+            await self._update()
+
+    def follow(self, browser_context):
+        """
+        Stream whichever page of browser_context the agent is on.
+        """
+        self.unfollow()
+        self._follow_task = asyncio.create_task(self._follow(browser_context))
+
+    def unfollow(self):
+        if self._follow_task is not None:
+            self._follow_task.cancel()
+            self._follow_task = None
+
+    async def _follow(self, browser_context):
+        while True:
+            # Wait for browser_use to finish setting up the session
+            if getattr(browser_context, 'session', None) is not None:
+                try:
+                    page = await browser_context.get_current_page()
+                except Exception:
+                    page = None
+                if page is not self._page:
+                    await self._switch(page)
+            await asyncio.sleep(FOLLOW_INTERVAL_S)
+
+    async def _detach(self):
+        await self._stop_screencast()
+        if self._cdp is not None:
+            try:
+                await self._cdp.detach()
+            except Exception:
+                pass
+        self._cdp = None
+
+    async def _switch(self, page):
+        async with self._lock:
+            await self._detach()
+            self._page = page
+            if page is not None:
+                try:
+                    cdp = await page.context.new_cdp_session(page)
+                except Exception:
+                    return
+                cdp.on('Page.screencastFrame', lambda params: self._on_frame(cdp, params))
+                self._cdp = cdp
+        await self._update()
+
+    async def _update(self):
+        """
+        Run the screencast while there is a page and at least one client.
+        """
+        async with self._lock:
+            if self._cdp is not None and self.clients:
+                await self._start_screencast()
+            else:
+                await self._stop_screencast()
+
+    async def _start_screencast(self):
+        if self._running:
+            return
+        quality, _ = QUALITY_LEVELS[self.level]
+        try:
+            await self._cdp.send('Page.startScreencast', {
+                'format': 'jpeg',
+                'quality': quality,
+                'maxWidth': self.max_width,
+                'maxHeight': self.max_height
+            })
+            self._running = True
+        except Exception:
+            # The page closed under us; the follow loop picks the next one
+            pass
+
+    async def _stop_screencast(self):
+        if not self._running:
+            return
+        self._running = False
+        try:
+            await self._cdp.send('Page.stopScreencast')
+        except Exception:
+            pass
+
+    async def _restart_screencast(self):
+        async with self._lock:
+            await self._stop_screencast()
+            if self._cdp is not None and self.clients:
+                await self._start_screencast()
+
+    def _on_frame(self, cdp, params: dict):
+        self._spawn(self._handle_frame(cdp, params))
+
+    async def _handle_frame(self, cdp, params: dict):
+        frame = base64.b64decode(params['data'])
+        digest = hashlib.sha1(frame).digest()
+        if digest == self._last_digest:
+            self.duplicates += 1
+        else:
+            self._last_digest = digest
+            self._last_frame = frame
+            self.frames += 1
+            for client in self.clients:
+                client.offer(frame)
+        self._adapt()
+
+        # Chrome sends the next frame only after this ack
+        _, max_fps = QUALITY_LEVELS[self.level]
+        delay = self._last_ack + 1 / max_fps - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            await cdp.send('Page.screencastFrameAck', {'sessionId': params['sessionId']})
+        except Exception:
+            pass
+        self._last_ack = time.monotonic()
+
+    def _adapt(self):
+        """
+        Step quality and frame rate down while clients drop frames, and back
+        up once they have kept up for a while.
+        """
+        now = time.monotonic()
+        drops = sum(client.dropped for client in self.clients)
+        if drops > self._drops_seen:
+            self._last_drop = now
+            if self.level < len(QUALITY_LEVELS) - 1 and now - self._level_changed >= STEP_DOWN_S:
+                self._set_level(self.level + 1, now)
+        elif self.level > 0 and now - max(self._last_drop, self._level_changed) >= STEP_UP_S:
+            self._set_level(self.level - 1, now)
+        self._drops_seen = drops
+
+    def _set_level(self, level: int, now: float):
+        old_quality, _ = QUALITY_LEVELS[self.level]
+        self.level = level
+        self._level_changed = now
+        # The frame rate applies from the next ack; a new quality needs a restart
+        if QUALITY_LEVELS[level][0] != old_quality:
+            self._spawn(self._restart_screencast())
+
+    def summary(self) -> str:
+        quality, max_fps = QUALITY_LEVELS[self.level]
+        return (f"Screencast: {self.frames} frame(s) published, {self.duplicates} duplicate(s) skipped, "
+                f"ended at quality {quality} / {max_fps:g} fps")
+
+    async def close(self):
+        follow_task, self._follow_task = self._follow_task, None
+        if follow_task is not None:
+            follow_task.cancel()
+            await asyncio.gather(follow_task, return_exceptions=True)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        async with self._lock:
+            await self._detach()
+            self._page = None
+        for client in list(self.clients):
+            client.writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
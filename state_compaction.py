@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Page-state compaction for the agent's LLM calls.
+
+Every agent step, browser_use sends the page's full list of interactive
+elements to the model, even when the step only scrolled or typed into one
+field. CompactingChatModel rewrites that list in the newest state message
+before calling `inner`:
+
+- diff: on the same URL as the previous step, new and changed elements are
+  sent in full and unchanged elements only as their index and visible text;
+  page text between elements is always kept, since browser_use drops the
+  previous step's state from the conversation
+- boilerplate: elements that were also on the previous pages at other URLs,
+  such as nav bars and footers, are collapsed into one line of indexes and
+  texts
+- cap: the element list is cut at max_chars, telling the agent to scroll for
+  the rest
+- full: when more than full_ratio of the elements changed, the list is sent
+  as a full snapshot (still capped, with boilerplate collapsed)
+
+Element indexes are always kept, so the agent can still act on every element.
+Action results and errors are never touched.
+"""
+import re
+import time
+from typing import List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.outputs import ChatResult
+
+from chat_wrapper import ChatModelWrapper
+from model_router import model_label
+
+DEFAULT_MAX_CHARS = 12000
+DEFAULT_FULL_RATIO = 0.5
+
+# An element counts as boilerplate when it was on this many previous pages
+BOILERPLATE_PAGES = 2
+
+# Rough characters per token of English text and HTML
+CHARS_PER_TOKEN = 4
+
+STATE_START = re.compile(r'Interactive elements from[^\n]*:\n')
+STATE_END = re.compile(r'\n(?=Action result|Action error|Current step|Current date)')
+URL_LINE = re.compile(r'Current url: (\S+)')
+# "[12]<a ...>text</a>" (newer browser_use) or "12[:]<a ...>text</a>" (older)
+ELEMENT_LINE = re.compile(r'^(\s*)(?:\[(\d+)\]|(\d+)\[:\])(.*)$')
+TAG = re.compile(r'<[^>]*>')
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """
+    Approximate prompt tokens of the text in messages (images not counted).
+    """
+    chars = 0
+    for message in messages:
+        if isinstance(message.content, str):
+            chars += len(message.content)
+        else:
+            chars += sum(len(part.get('text', '')) for part in message.content if isinstance(part, dict))
+    return chars // CHARS_PER_TOKEN
+
+def _message_text(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return ''.join(part.get('text', '') for part in message.content
+                   if isinstance(part, dict) and part.get('type') == 'text')
+
+def _with_text(message: BaseMessage, text: str) -> BaseMessage:
+    """
+    Copy of message with its text replaced and any image parts kept.
+    """
+    if isinstance(message.content, str):
+        return message.model_copy(update={'content': text})
+    parts = [part for part in message.content if not (isinstance(part, dict) and part.get('type') == 'text')]
+    return message.model_copy(update={'content': [{'type': 'text', 'text': text}] + parts})
+
+def _compact_element(index: str, rest: str) -> str:
+    text = ' '.join(TAG.sub(' ', rest).split())
+    if not text:
+        # No visible text (inputs, icons): keep the opening tag, shortened
+        text = rest.split('>', 1)[0][:60] + '>'
+    return f"[{index}]{text[:80]}"
+
+class CompactingChatModel(ChatModelWrapper):
+    """
+    Chat model that compacts the page state in each call before calling `inner`.
+
+    Use one instance per task, since it compares each state with the previous one.
+    """
+    inner: BaseChatModel
+    max_chars: int = DEFAULT_MAX_CHARS
+    full_ratio: float = DEFAULT_FULL_RATIO
+    calls: List[dict] = []
+    previous_url: Optional[str] = None
+    previous_keys: set = set()
+    # (url, element keys) of the last pages visited, one entry per URL visit
+    pages: List[tuple] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return f"compacting-{self.inner._llm_type}"
+
+    @property
+    def model_name(self) -> str:
+        return model_label(self.inner)
+
+    def _compact_elements(self, url: str, block: str):
+        """
+        Return the compacted element block, its mode and the number of
+        collapsed boilerplate elements.
+        """
+        lines = block.split('\n')
+        parsed = []
+        for line in lines:
+            match = ELEMENT_LINE.match(line)
+            if match:
+                index = match.group(2) or match.group(3)
+                parsed.append((line, index, match.group(4).strip()))
+            else:
+                parsed.append((line, None, line.strip()))
+        keys = {key for _, index, key in parsed if index is not None}
+
+        mode = 'full'
+        if url == self.previous_url and self.previous_keys and keys:
+            changed = len(keys - self.previous_keys)
+            if changed / len(keys) <= self.full_ratio:
+                mode = 'diff'
+
+        boilerplate = set()
+        other_pages = [page_keys for page_url, page_keys in self.pages if page_url != url][-BOILERPLATE_PAGES:]
+        if keys and len(other_pages) == BOILERPLATE_PAGES:
+            boilerplate = keys.intersection(*other_pages)
+
+        out, collapsed = [], []
+        for line, index, key in parsed:
+            if index is None:
+                # Page text is the agent's only copy of what the page says
+                out.append(line)
+            elif key in boilerplate:
+                collapsed.append(_compact_element(index, key))
+            elif mode == 'diff' and key in self.previous_keys:
+                out.append(ELEMENT_LINE.match(line).group(1) + _compact_element(index, key))
+            else:
+                out.append(line)
+
+        header = []
+        if collapsed:
+            header.append("Repeated site navigation and footer: " + ' '.join(collapsed))
+        if mode == 'diff':
+            header.append("(Same page as the previous step: new and changed elements are shown in full, "
+                          "unchanged ones as [index]text)")
+        text = '\n'.join(header + out)
+        if len(text) > self.max_chars:
+            cut = text.rfind('\n', 0, self.max_chars)
+            cut = cut if cut > 0 else self.max_chars
+            remaining = text[cut:].count('\n')
+            text = text[:cut] + f"\n... {remaining} more line(s) cut; scroll down to see them"
+
+        if self.pages and self.pages[-1][0] == url:
+            self.pages = self.pages[:-1]
+        self.pages = (self.pages + [(url, keys)])[-(BOILERPLATE_PAGES + 1):]
+        self.previous_url = url
+        self.previous_keys = keys
+        return text, mode, len(collapsed)
+
+    def _compact(self, messages: List[BaseMessage]):
+        """
+        Return the messages with the newest state compacted, and the call's stats.
+        """
+        for position in range(len(messages) - 1, -1, -1):
+            message = messages[position]
+            if not isinstance(message, HumanMessage):
+                continue
+            text = _message_text(message)
+            start = STATE_START.search(text)
+            if start is None:
+                continue
+            end = STATE_END.search(text, start.end())
+            end = end.start() if end else len(text)
+            url_match = URL_LINE.search(text)
+            block, mode, collapsed = self._compact_elements(
+                url_match.group(1) if url_match else '', text[start.end():end]
+            )
+            compacted = list(messages)
+            compacted[position] = _with_text(message, text[:start.end()] + block + text[end:])
+            return compacted, {'mode': mode, 'boilerplate': collapsed}
+        return messages, {'mode': None, 'boilerplate': 0}
+
+    def _record(self, messages, compacted, stats: dict, started: float):
+        self.calls.append({
+            **stats,
+            'original_tokens': estimate_tokens(messages),
+            'sent_tokens': estimate_tokens(compacted),
+            'latency_s': round(time.perf_counter() - started, 3)
+        })
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        compacted, stats = self._compact(messages)
+        started = time.perf_counter()
+        result = self.inner._generate(compacted, stop=stop, run_manager=run_manager, **kwargs)
+        self._record(messages, compacted, stats, started)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        compacted, stats = self._compact(messages)
+        started = time.perf_counter()
+        result = await self.inner._agenerate(compacted, stop=stop, run_manager=run_manager, **kwargs)
+        self._record(messages, compacted, stats, started)
+        return result
+
+    def seconds_per_token(self) -> Optional[float]:
+        """
+        Slope of call latency over sent tokens (least squares), or None
+        without enough spread in the data.
+        """
+        points = [(c['sent_tokens'], c['latency_s']) for c in self.calls]
+        if len(points) < 3:
+            return None
+        mean_tokens = sum(t for t, _ in points) / len(points)
+        mean_latency = sum(s for _, s in points) / len(points)
+        variance = sum((t - mean_tokens) ** 2 for t, _ in points)
+        if variance == 0:
+            return None
+        slope = sum((t - mean_tokens) * (s - mean_latency) for t, s in points) / variance
+        return max(slope, 0.0)
+
+    def summary(self) -> str:
+        """
+        States compacted, tokens before and after, and estimated latency saved.
+        """
+        states = [c for c in self.calls if c['mode'] is not None]
+        original = sum(c['original_tokens'] for c in self.calls)
+        sent = sum(c['sent_tokens'] for c in self.calls)
+        line = (f"State compaction: {len(states)} state(s) "
+                f"({sum(c['mode'] == 'diff' for c in states)} diff, "
+                f"{sum(c['mode'] == 'full' for c in states)} full, "
+                f"{sum(c['boilerplate'] for c in states)} boilerplate element(s) collapsed), "
+                f"~{original} -> ~{sent} prompt tokens")
+        if original:
+            line += f" ({100 * (original - sent) / original:.0f}% saved"
+            if self.calls:
+                line += f", {(original - sent) / len(self.calls):.0f}/call"
+            slope = self.seconds_per_token()
+            if slope is not None:
+                line += f", ~{slope * (original - sent):.1f}s LLM time saved"
+            line += ")"
+        return line
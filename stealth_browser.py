@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Browser and browser context classes used by cli.py.
+
+Kept out of cli.py so that importing it (and running `cli.py --help`) does
+not load browser_use and playwright_stealth; cli.create_browser imports
+this module when a browser is actually needed.
+"""
+import time
+from typing import Optional
+
+from browser_use.browser.browser import Browser
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from playwright_stealth.stealth import StealthConfig
+
+from http_cache import CacheStats, HttpCache
+from network_profiles import NetworkProfile, NetworkStats
+from profiler import span
+from screencast import ScreencastPublisher
+
+# Combined stealth evasion script, built once per process
+_STEALTH_SCRIPT: Optional[str] = None
+
+def get_stealth_script() -> str:
+    """
+    Return every playwright-stealth evasion joined into a single init script.
+    
+    stealth_async adds each evasion with its own add_init_script call (one CDP
+    round-trip each, for every page); the combined payload is registered once
+    per browser context instead and inherited by all of its pages.
+    """
+    global _STEALTH_SCRIPT
+    if _STEALTH_SCRIPT is None:
+        _STEALTH_SCRIPT = '\n;\n'.join(StealthConfig().enabled_scripts)
+    return _STEALTH_SCRIPT
+
+class StealthBrowserContext(BrowserContext):
+    """
+    Browser context that registers the stealth script once for all its pages
+    and applies the browser's network profile to every request.
+    """
+    def __init__(self, config: BrowserContextConfig, browser: 'StealthBrowser'):
+        super().__init__(config=config, browser=browser)
+        self.stealth_setup_s = 0.0
+        self.pages_opened = 0
+        self.network_stats: Optional[NetworkStats] = None
+        self.cache_stats: Optional[CacheStats] = None
+    
+    async def _create_context(self, browser):
+        """
+        Create the Playwright context and add the stealth init script to it.
+        """
+        context = await super()._create_context(browser)
+        
+        # Routes run last-registered first: the network profile blocks what it
+        # must and falls back to the cache for everything else
+        with span('context.routes', 'browser'):
+            if self.browser.http_cache is not None:
+                self.cache_stats = await self.browser.http_cache.attach(context)
+            if self.browser.network_profile is not None:
+                self.network_stats = await self.browser.network_profile.attach(context)
+        
+        if self.browser.stealth_enabled:
+            print("Applying stealth mode to avoid captchas...")
+            started = time.perf_counter()
+            with span('stealth.init_script', 'stealth'):
+                await context.add_init_script(get_stealth_script())
+            self.stealth_setup_s = time.perf_counter() - started
+            
+            # Count pages (including ones opened by the site) to report the per-page cost
+            self.pages_opened = len(context.pages)
+            context.on('page', self._on_page)
+        
+        if self.browser.screencast is not None:
+            self.browser.screencast.follow(self)
+        
+        return context
+    
+    def _on_page(self, page):
+        self.pages_opened += 1
+    
+    async def close(self):
+        if self.browser.stealth_enabled and self.browser.report_stealth_timing:
+            pages = max(self.pages_opened, 1)
+            print(f"Stealth setup: {self.stealth_setup_s * 1000:.1f} ms once for "
+                  f"{self.pages_opened} page(s), {self.stealth_setup_s * 1000 / pages:.2f} ms per page")
+        if self.network_stats is not None:
+            print(self.network_stats.summary())
+        if self.cache_stats is not None:
+            print(self.cache_stats.summary())
+        if self.browser.screencast is not None:
+            self.browser.screencast.unfollow()
+        await super().close()
+
+# Custom Browser class that applies stealth mode
+class StealthBrowser(Browser):
+    """
+    Extended Browser class that applies stealth mode to each page.
+    
+    Stealth is registered once per browser context, so every page the agent
+    opens inherits it without any per-page setup. An optional network profile
+    blocks resources the agent doesn't need on every page as well, an
+    optional HTTP cache serves repeat downloads from disk, and an optional
+    screencast publishes the page the agent is on.
+    """
+    def __init__(self, config=None, stealth_enabled=False, report_stealth_timing=False,
+                 network_profile: Optional[NetworkProfile] = None,
+                 http_cache: Optional[HttpCache] = None,
+                 screencast: Optional[ScreencastPublisher] = None):
+        super().__init__(config=config)
+        self.stealth_enabled = stealth_enabled
+        self.report_stealth_timing = report_stealth_timing
+        self.network_profile = network_profile
+        self.http_cache = http_cache
+        self.screencast = screencast
+        
+    async def new_context(self, config: BrowserContextConfig = None) -> StealthBrowserContext:
+        """
+        Create a new browser context with stealth mode applied.
+        """
+        return StealthBrowserContext(
+            config=config or self.config.new_context_config,
+            browser=self
+        )
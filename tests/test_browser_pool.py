@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('browser_use')
+
+import browser_pool
+from browser_pool import BrowserPool
+
+class FakeContext:
+    def __init__(self):
+        self.sessions = 0
+        self.closed = False
+
+    async def get_session(self):
+        self.sessions += 1
+
+    async def close(self):
+        self.closed = True
+
+class FakePlaywrightBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+class FakeBrowser:
+    launched = []
+
+    def __init__(self):
+        self.playwright_browser = None
+        self.contexts = []
+        self.closed = False
+        FakeBrowser.launched.append(self)
+
+    async def get_playwright_browser(self):
+        self.playwright_browser = FakePlaywrightBrowser()
+        return self.playwright_browser
+
+    async def new_context(self):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+
+@pytest.fixture(autouse=True)
+def fake_browsers(monkeypatch):
+    FakeBrowser.launched = []
+    monkeypatch.setattr(browser_pool, 'create_browser', lambda config, **kwargs: FakeBrowser())
+
+async def settle(pool: BrowserPool):
+    await asyncio.gather(*pool._refresh_tasks)
+
+def test_lease_hands_out_warm_browsers_and_refreshes_their_context():
+    async def scenario():
+        async with BrowserPool(config=None, size=2) as pool:
+            assert len(FakeBrowser.launched) == 2
+            async with pool.lease() as lease:
+                used = lease.context
+                assert used.sessions == 1
+            await settle(pool)
+            assert used.closed
+            assert lease.context is not used
+            assert lease.tasks_run == 1
+            assert pool._idle.qsize() == 2
+        assert all(browser.closed for browser in FakeBrowser.launched)
+
+    asyncio.run(scenario())
+
+def test_browser_is_recycled_after_max_tasks():
+    async def scenario():
+        async with BrowserPool(config=None, size=1, max_tasks_per_browser=2) as pool:
+            for _ in range(2):
+                async with pool.lease():
+                    pass
+                await settle(pool)
+            first = FakeBrowser.launched[0]
+            assert first.closed
+            async with pool.lease() as lease:
+                assert lease.browser is FakeBrowser.launched[1]
+                assert lease.tasks_run == 0
+
+    asyncio.run(scenario())
+
+def test_disconnected_browser_is_relaunched_on_acquire():
+    async def scenario():
+        async with BrowserPool(config=None, size=1) as pool:
+            FakeBrowser.launched[0].playwright_browser.connected = False
+            async with pool.lease() as lease:
+                assert lease.browser is FakeBrowser.launched[1]
+            assert FakeBrowser.launched[0].closed
+
+    asyncio.run(scenario())
+
+def test_pool_size_must_be_positive():
+    with pytest.raises(ValueError):
+        BrowserPool(config=None, size=0)
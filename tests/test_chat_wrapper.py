@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip('langchain_core')
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from llm_cache import CachedChatModel
+from model_router import RoutedChatModel
+from state_compaction import CompactingChatModel
+
+class ToolFormattingModel(FakeListChatModel):
+    tool_format: str = 'plain'
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[{'format': self.tool_format, 'name': tool} for tool in tools], **kwargs)
+
+def model(tool_format='plain') -> ToolFormattingModel:
+    return ToolFormattingModel(responses=['ok'], tool_format=tool_format)
+
+def test_wrappers_bind_tools_formatted_by_the_wrapped_model():
+    wrappers = [
+        CachedChatModel(inner=model(), response_cache=None, model_name='fake'),
+        CompactingChatModel(inner=model()),
+        RoutedChatModel(fast=model('fast'), strong=model()),
+    ]
+    for wrapper in wrappers:
+        bound = wrapper.bind_tools(['click'], tool_choice='auto')
+        assert bound.bound is wrapper
+        assert bound.kwargs == {'tools': [{'format': 'plain', 'name': 'click'}], 'tool_choice': 'auto'}
@@ -0,0 +1,66 @@
+import os
+import stat
+
+import pytest
+
+from checkpoints import RESUME_CONTENT_CHARS, RESUME_TOTAL_CHARS, RunCheckpoint
+
+def step(url, goal, *contents):
+    return {
+        'model_output': {'current_state': {'next_goal': goal}},
+        'results': [{'extracted_content': content, 'error': None, 'is_done': False} for content in contents],
+        'url': url,
+        'title': None
+    }
+
+@pytest.mark.parametrize('run_id', ['', '../secrets', 'runs/1', '.hidden', '..'])
+def test_path_for_rejects_run_ids_that_leave_the_directory(run_id):
+    with pytest.raises(ValueError):
+        RunCheckpoint.path_for('Checkpoints', run_id)
+
+def test_path_for_names_the_file_after_the_run():
+    assert RunCheckpoint.path_for('Checkpoints', 'a1b2c3') == os.path.join('Checkpoints', 'a1b2c3.json')
+
+def test_save_and_load_round_trip(tmp_path):
+    checkpoint = RunCheckpoint.create(str(tmp_path), 'run-1', 'Research X')
+    checkpoint.steps = [step('https://example.com/', 'Open the site')]
+    checkpoint.urls = ['https://example.com/']
+    checkpoint.current_url = 'https://example.com/'
+    checkpoint.save()
+    assert stat.S_IMODE(os.stat(checkpoint.path).st_mode) == 0o600
+
+    loaded = RunCheckpoint.load(str(tmp_path), 'run-1')
+    assert loaded.task == 'Research X'
+    assert loaded.completed_steps == 1
+    assert loaded.prior_steps == checkpoint.steps
+    assert loaded.current_url == 'https://example.com/'
+
+    loaded.discard()
+    with pytest.raises(ValueError):
+        RunCheckpoint.load(str(tmp_path), 'run-1')
+
+def test_resume_task_lists_the_steps_and_what_they_extracted():
+    checkpoint = RunCheckpoint('run-1.json', 'run-1', 'Research X', steps=[
+        step('https://example.com/', 'Open the site'),
+        step('https://example.com/news', 'Extract the headlines', 'Headline one; headline two'),
+        {'model_output': None, 'results': [], 'url': None, 'title': None},
+    ])
+    lines = checkpoint.resume_task().split('\n')
+    assert lines[0] == 'Research X'
+    assert 'interrupted after 3 step(s)' in lines[2]
+    assert lines[3:] == [
+        '- Step 1 (https://example.com/): Open the site',
+        '- Step 2 (https://example.com/news): Extract the headlines',
+        '  Extracted: Headline one; headline two',
+        '- Step 3 (no page)',
+        'Continue from here without repeating completed steps.',
+    ]
+
+def test_resume_task_caps_extracted_content():
+    steps = [step(f'https://example.com/{i}', 'Extract', 'x' * (RESUME_CONTENT_CHARS + 500)) for i in range(10)]
+    task = RunCheckpoint('run-1.json', 'run-1', 'Research X', steps=steps).resume_task()
+    extracted = [line for line in task.split('\n') if line.startswith('  Extracted: ')]
+    assert all(len(line) - len('  Extracted: ') <= RESUME_CONTENT_CHARS for line in extracted)
+    assert sum(len(line) - len('  Extracted: ') for line in extracted) == RESUME_TOTAL_CHARS
+    # Every step is still listed
+    assert task.count('- Step ') == 10
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+psutil = pytest.importorskip('psutil')
+
+import chrome_manager
+from chrome_manager import ChromeManager
+
+OWN_CREATE_TIME = psutil.Process().create_time()
+
+def add_instance(manager: ChromeManager, port: int, **meta) -> str:
+    instance_dir = os.path.join(manager.base_dir, f"port-{port}")
+    os.makedirs(instance_dir, exist_ok=True)
+    manager._write_instance(instance_dir, {
+        'pid': os.getpid(),
+        'create_time': OWN_CREATE_TIME,
+        'port': port,
+        'chrome_path': '/usr/bin/chrome',
+        'extra_args': [],
+        'started_at': time.time(),
+        'last_used': time.time(),
+        **meta
+    })
+    return instance_dir
+
+@pytest.fixture
+def devtools(monkeypatch):
+    async def fake_wait_for_devtools(port, timeout=15.0, host='127.0.0.1'):
+        return {'webSocketDebuggerUrl': f"ws://127.0.0.1:{port}/devtools/browser/1"}
+
+    monkeypatch.setattr(chrome_manager, 'wait_for_devtools', fake_wait_for_devtools)
+
+def test_lock_is_exclusive_between_managers(tmp_path):
+    first, second = ChromeManager(str(tmp_path)), ChromeManager(str(tmp_path))
+    instance_dir = add_instance(first, 9301)
+
+    assert first._try_lock(instance_dir)
+    assert not second._try_lock(instance_dir)
+    assert second._is_locked(instance_dir)
+    assert second._lock_owner(instance_dir) == os.getpid()
+
+    first._unlock(instance_dir)
+    assert not second._is_locked(instance_dir)
+    assert second._try_lock(instance_dir)
+    second._unlock(instance_dir)
+
+def test_reused_pid_is_not_taken_for_the_instance(tmp_path):
+    manager = ChromeManager(str(tmp_path))
+    assert manager._is_running({'pid': os.getpid(), 'create_time': OWN_CREATE_TIME})
+    # Same PID, but a process started at another time
+    assert not manager._is_running({'pid': os.getpid(), 'create_time': OWN_CREATE_TIME - 3600})
+    # Records from before start times were kept can't be verified
+    assert not manager._is_running({'pid': os.getpid()})
+
+def test_reap_forgets_dead_instances_but_skips_locked_ones(tmp_path):
+    manager, other_run = ChromeManager(str(tmp_path)), ChromeManager(str(tmp_path))
+    dead = add_instance(manager, 9302, create_time=OWN_CREATE_TIME - 3600)
+    in_use = add_instance(manager, 9303, create_time=OWN_CREATE_TIME - 3600)
+    alive = add_instance(manager, 9304)
+    assert other_run._try_lock(in_use)
+
+    assert manager.reap_orphans() == 1
+    assert manager._read_instance(dead) is None
+    assert manager._read_instance(in_use) is not None
+    assert manager._read_instance(alive) is not None
+    other_run._unlock(in_use)
+
+def test_reuse_needs_the_same_launch_arguments(tmp_path, devtools):
+    manager = ChromeManager(str(tmp_path))
+    add_instance(manager, 9305, extra_args=['--disable-gpu', '--headless=new'])
+
+    async def reuse(extra_args):
+        return await manager._reuse('/usr/bin/chrome', extra_args, None)
+
+    assert asyncio.run(reuse(['--headless=new'])) is None
+    assert asyncio.run(reuse(['--disable-gpu', '--headless=new', '--proxy-server=localhost:8080'])) is None
+
+    instance = asyncio.run(reuse(['--remote-debugging-port=1234', '--headless=new', '--disable-gpu']))
+    assert instance.port == 9305
+    assert instance.pid == os.getpid()
+    assert instance.ws_url == 'ws://127.0.0.1:9305/devtools/browser/1'
+    # Locked for this run now, so a second run can't take it too
+    assert asyncio.run(ChromeManager(str(tmp_path))._reuse('/usr/bin/chrome', ['--disable-gpu', '--headless=new'], None)) is None
+    manager.release(instance)
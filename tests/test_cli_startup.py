@@ -0,0 +1,10 @@
+import pytest
+
+pytest.importorskip('aiohttp')
+pytest.importorskip('browser_use')
+
+from benchmark import modules_loaded_by_cli_import
+
+def test_importing_cli_loads_none_of_the_deferred_modules():
+    # In a fresh interpreter, since this test process has loaded them already
+    assert modules_loaded_by_cli_import() == []
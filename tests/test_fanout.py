@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('browser_use')
+
+from fanout import fan_out, format_results
+
+class FakePage:
+    def __init__(self, context, url='about:blank'):
+        self.context = context
+        self.url = url
+        self.closed = False
+        self.in_front = False
+
+    async def goto(self, url, wait_until=None):
+        self.url = url
+        await asyncio.sleep(self.context.load_times.get(url, 0.01))
+
+    async def title(self):
+        return f"Title of {self.url}"
+
+    async def inner_text(self, selector):
+        return f"Text of {self.url}"
+
+    async def close(self):
+        self.closed = True
+        self.context.open_tabs -= 1
+
+    async def bring_to_front(self):
+        self.in_front = True
+
+class FakePlaywrightContext:
+    def __init__(self, browser_context, load_times):
+        self.browser_context = browser_context
+        self.load_times = load_times
+        self.tabs = []
+        self.open_tabs = 0
+        self.max_open_tabs = 0
+
+    async def new_page(self):
+        # Like browser_use's page listener: a new tab makes it forget the current one
+        self.browser_context.state.target_id = None
+        page = FakePage(self)
+        self.tabs.append(page)
+        self.open_tabs += 1
+        self.max_open_tabs = max(self.max_open_tabs, self.open_tabs)
+        return page
+
+class FakeBrowserContext:
+    def __init__(self, load_times=None):
+        self.state = SimpleNamespace(target_id='agent-tab')
+        self.context = FakePlaywrightContext(self, load_times or {})
+        self.agent_page = FakePage(self.context, 'https://example.com/start')
+
+    async def get_session(self):
+        return SimpleNamespace(context=self.context)
+
+    async def get_current_page(self):
+        return self.agent_page
+
+def test_fan_out_caps_open_tabs_and_times_out_slow_pages():
+    urls = [f"https://example.com/{i}" for i in range(6)]
+    browser_context = FakeBrowserContext({'https://example.com/2': 5.0})
+
+    results = asyncio.run(fan_out(browser_context, urls, 'goal', max_tabs=2, tab_timeout_s=0.2))
+
+    assert [r['url'] for r in results] == urls
+    assert [r['status'] for r in results] == ['ok', 'ok', 'timeout', 'ok', 'ok', 'ok']
+    assert results[0]['content'] == 'Text of https://example.com/0'
+    assert results[2]['content'] == 'timed out after 0.2s'
+    assert browser_context.context.max_open_tabs == 2
+    assert all(tab.closed for tab in browser_context.context.tabs)
+
+def test_fan_out_puts_the_agent_back_on_its_page():
+    browser_context = FakeBrowserContext()
+    asyncio.run(fan_out(browser_context, ['https://example.com/a', 'https://example.com/b'], 'goal'))
+    assert browser_context.state.target_id == 'agent-tab'
+    assert browser_context.agent_page.in_front
+
+def test_format_results_reports_failures_and_skipped_urls():
+    results = [
+        {'url': 'https://example.com/a', 'title': 'A', 'status': 'ok', 'content': 'Fact A', 'duration_s': 1.0},
+        {'url': 'https://example.com/b', 'status': 'timeout', 'content': 'timed out after 30s', 'duration_s': 30.0},
+    ]
+    text = format_results(results, 30.5, ['https://example.com/c'])
+    assert text.split('\n')[0] == 'Fetched 1/2 page(s) in parallel in 30.5s (31.0s of tab time)'
+    assert '## https://example.com/a (A)\nFact A' in text
+    assert '## https://example.com/b [timeout]' in text
+    assert text.endswith('https://example.com/c')
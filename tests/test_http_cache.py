@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+import pytest
+
+from http_cache import HttpCache, freshness_lifetime, is_storable
+
+NOW = 1_700_000_000.0
+DATE = 'Tue, 14 Nov 2023 22:13:20 GMT'  # NOW
+
+def test_freshness_from_cache_control():
+    assert freshness_lifetime({'cache-control': 'public, max-age=600'}, NOW) == 600
+    assert freshness_lifetime({'cache-control': 'max-age=600, s-maxage=60'}, NOW) == 60
+    # no-cache wins over max-age: every use revalidates
+    assert freshness_lifetime({'cache-control': 'no-cache, max-age=600'}, NOW) == 0
+    assert freshness_lifetime({'cache-control': 'max-age=600, no-cache="set-cookie"'}, NOW) == 0
+
+def test_freshness_from_expires_and_last_modified():
+    assert freshness_lifetime({'date': DATE, 'expires': 'Tue, 14 Nov 2023 23:13:20 GMT'}, NOW) == 3600
+    assert freshness_lifetime({'date': DATE, 'expires': 'Tue, 14 Nov 2023 21:13:20 GMT'}, NOW) == 0
+    assert freshness_lifetime({'date': DATE, 'expires': '0'}, NOW) == 0
+    # Heuristic: a tenth of the time since the last change, at most a day
+    assert freshness_lifetime({'date': DATE, 'last-modified': 'Tue, 14 Nov 2023 12:13:20 GMT'}, NOW) == 3600
+    assert freshness_lifetime({'date': DATE, 'last-modified': 'Tue, 14 Nov 2022 22:13:20 GMT'}, NOW) == 24 * 3600
+    assert freshness_lifetime({}, NOW) == 0
+
+def test_storable_responses():
+    assert is_storable(200, {'cache-control': 'max-age=600'})
+    assert is_storable(200, {'vary': 'Accept-Encoding'})
+    assert not is_storable(404, {})
+    assert not is_storable(200, {'cache-control': 'no-store'})
+    assert not is_storable(200, {'cache-control': 'private, max-age=600'})
+    assert not is_storable(200, {'set-cookie': 'session=1'})
+    assert not is_storable(200, {'vary': 'Accept-Encoding, User-Agent'})
+
+def test_credentialed_requests_are_only_stored_when_public():
+    assert not is_storable(200, {'cache-control': 'max-age=600'}, {'Cookie': 'session=1'})
+    assert not is_storable(200, {}, {'authorization': 'Bearer token'})
+    assert is_storable(200, {'cache-control': 'public, max-age=600'}, {'cookie': 'session=1'})
+
+class FakeResponse:
+    def __init__(self, status, headers, body=b''):
+        self.status = status
+        self.headers = headers
+        self._body = body
+
+    async def body(self):
+        return self._body
+
+class FakeRoute:
+    def __init__(self, url, headers, responses):
+        self.request = self
+        self.url = url
+        self.method = 'GET'
+        self.headers = headers
+        self.responses = responses
+        self.fetched_with = []
+        self.outcome = None
+
+    async def all_headers(self):
+        return self.headers
+
+    async def fetch(self, headers=None, max_redirects=None):
+        self.fetched_with.append(headers)
+        return self.responses.pop(0)
+
+    async def fulfill(self, status, headers, body):
+        self.outcome = ('fulfill', status, body)
+
+    async def fallback(self):
+        self.outcome = ('fallback',)
+
+class FakeContext:
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    yield cache
+    cache.close()
+
+def request(cache, url, *responses, headers=None):
+    async def scenario():
+        context = FakeContext()
+        stats = await cache.attach(context)
+        route = FakeRoute(url, headers or {}, list(responses))
+        await context.handler(route)
+        return route, stats
+
+    return asyncio.run(scenario())
+
+def test_fresh_entry_is_served_from_disk(cache):
+    url = 'https://example.com/app.js'
+    route, _ = request(cache, url, FakeResponse(200, {'cache-control': 'max-age=600'}, b'v1'))
+    assert route.outcome == ('fulfill', 200, b'v1')
+
+    route, stats = request(cache, url)
+    assert route.fetched_with == []
+    assert route.outcome == ('fulfill', 200, b'v1')
+    assert stats.hits == 1
+
+def test_stale_entry_is_revalidated(cache):
+    url = 'https://example.com/page'
+    request(cache, url, FakeResponse(200, {'cache-control': 'no-cache', 'etag': '"v1"'}, b'v1'))
+
+    route, stats = request(cache, url, FakeResponse(304, {'cache-control': 'max-age=600'}))
+    assert route.fetched_with[0]['if-none-match'] == '"v1"'
+    assert route.outcome == ('fulfill', 200, b'v1')
+    assert stats.revalidated == 1
+    # The 304's max-age made the entry fresh
+    assert cache.lookup(url)['expires_at'] > time.time()
+
+    route, stats = request(cache, url)
+    assert stats.hits == 1
+
+def test_changed_resource_replaces_the_entry(cache):
+    url = 'https://example.com/page'
+    request(cache, url, FakeResponse(200, {'etag': '"v1"'}, b'v1'))
+    route, stats = request(cache, url, FakeResponse(200, {'etag': '"v2"'}, b'v2'))
+    assert route.outcome == ('fulfill', 200, b'v2')
+    assert stats.misses == 1
+    assert cache.lookup(url)['body'] == b'v2'
+
+def test_credentialed_and_range_requests_skip_the_cache(cache):
+    url = 'https://example.com/account'
+    request(cache, url, FakeResponse(200, {'cache-control': 'max-age=600'}, b'anonymous'))
+
+    route, stats = request(cache, url, FakeResponse(200, {'cache-control': 'max-age=600'}, b'mine'),
+                           headers={'cookie': 'session=1'})
+    assert route.outcome == ('fulfill', 200, b'mine')
+    assert route.fetched_with == [None]
+    assert stats.hits == 0
+    assert cache.lookup(url)['body'] == b'anonymous'
+
+    route, _ = request(cache, url, headers={'range': 'bytes=0-99'})
+    assert route.outcome == ('fallback',)
+
+def test_eviction_by_age_then_least_recently_used(tmp_path):
+    cache = HttpCache(str(tmp_path), max_mb=2500 / (1024 * 1024))
+    try:
+        for name in ('a', 'b', 'c'):
+            cache.store(name, 200, {}, b'x' * 1000)
+        cache.db.execute("UPDATE entries SET last_access = 1 WHERE key = 'b'")
+        cache.evict()
+        assert cache.lookup('b') is None
+        assert cache.lookup('a') is not None and cache.lookup('c') is not None
+
+        cache.db.execute("UPDATE entries SET stored_at = 1 WHERE key = 'c'")
+        cache.evict()
+        assert cache.lookup('c') is None
+        assert cache.lookup('a') is not None
+    finally:
+        cache.close()
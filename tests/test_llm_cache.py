@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip('langchain_core')
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from llm_cache import CachedChatModel, LLMCacheMiss, LLMResponseCache
+
+def state_message(page: str, time_str: str, screenshot: str) -> HumanMessage:
+    text = (
+        'Current url: https://example.com/\n'
+        f'Interactive elements from top layer of the current page inside the viewport:\n{page}\n'
+        'Current step: 2/100Current date and time: ' + time_str
+    )
+    return HumanMessage(content=[
+        {'type': 'text', 'text': text},
+        {'type': 'image_url', 'image_url': {'url': f'data:image/png;base64,{screenshot}'}}
+    ])
+
+def messages(page='[1]<a href="/news">News</a>', time_str='2024-05-01 10:00', screenshot='iVBORw0KGgoAAA'):
+    return [SystemMessage(content='You are a browser agent.'), state_message(page, time_str, screenshot)]
+
+@pytest.fixture
+def response_cache(tmp_path):
+    cache = LLMResponseCache(str(tmp_path))
+    yield cache
+    cache.close()
+
+def cached(response_cache, replay=False) -> CachedChatModel:
+    return CachedChatModel(inner=FakeListChatModel(responses=['first', 'second']),
+                           response_cache=response_cache, replay=replay, model_name='fake')
+
+def test_rerun_at_another_time_hits_the_cache(response_cache):
+    model = cached(response_cache)
+    assert model.invoke(messages()).content == 'first'
+    assert model.invoke(messages(time_str='2024-05-02 18:31', screenshot='R0lGODlhAQABAAAA')).content == 'first'
+    assert response_cache.hits == 1
+
+def test_changed_page_state_misses(response_cache):
+    model = cached(response_cache)
+    model.invoke(messages())
+    assert model.invoke(messages(page='[1]<a href="/sport">Sport</a>')).content == 'second'
+    assert response_cache.hits == 0
+
+def test_replay_fails_on_a_miss(response_cache):
+    cached(response_cache).invoke(messages())
+    replay = cached(response_cache, replay=True)
+    assert replay.invoke(messages(time_str='2024-06-01 09:00')).content == 'first'
+    with pytest.raises(LLMCacheMiss):
+        replay.invoke(messages(page='[1]<a href="/sport">Sport</a>'))
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip('langchain_core')
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from model_router import RoutedChatModel
+
+TOOLS = {'tools': [{'type': 'function', 'function': {'name': 'AgentOutput'}}]}
+
+ACTION = AIMessage(content='', tool_calls=[{'name': 'AgentOutput', 'args': {}, 'id': 'call-1'}])
+
+class ScriptedModel(BaseChatModel):
+    model_name: str
+    answer: AIMessage = ACTION
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return 'scripted'
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=self.answer)])
+
+def router(**kwargs) -> RoutedChatModel:
+    return RoutedChatModel(fast=ScriptedModel(model_name='fast'), strong=ScriptedModel(model_name='strong'), **kwargs)
+
+def state(text: str = 'Current url: https://example.com/'):
+    return [SystemMessage(content='You are a browser agent.'), ACTION, HumanMessage(content=text)]
+
+def reasons(model: RoutedChatModel):
+    return [(call['model'], call['reason']) for call in model.calls]
+
+def test_first_step_plans_on_strong_then_routine_steps_go_fast():
+    model = router()
+    for _ in range(3):
+        model._generate(state(), **TOOLS)
+    assert reasons(model) == [('strong', 'planning'), ('fast', 'routine'), ('fast', 'routine')]
+
+def test_calls_without_tools_are_extraction_and_do_not_count_as_steps():
+    model = router()
+    model._generate(state())
+    model._generate(state(), **TOOLS)
+    assert reasons(model) == [('strong', 'extraction'), ('strong', 'planning')]
+    assert model.agent_steps == 1
+
+def test_failed_action_escalates_for_escalation_steps():
+    model = router(escalation_steps=2)
+    model._generate(state(), **TOOLS)
+    model._generate(state('Action error: element 5 is not clickable'), **TOOLS)
+    model._generate(state(), **TOOLS)
+    model._generate(state(), **TOOLS)
+    assert reasons(model) == [('strong', 'planning'), ('strong', 'error-recovery'),
+                              ('strong', 'error-recovery'), ('fast', 'routine')]
+
+def test_only_errors_since_the_last_answer_escalate():
+    model = router()
+    model._generate(state(), **TOOLS)
+    messages = [HumanMessage(content='Action error: timeout'), ACTION, HumanMessage(content='Current url: https://example.com/')]
+    model._generate(messages, **TOOLS)
+    assert reasons(model)[-1] == ('fast', 'routine')
+
+def test_fast_answer_without_an_action_is_retried_on_strong():
+    model = router()
+    model.fast.answer = AIMessage(content='I think I should click the link.')
+    model._generate(state(), **TOOLS)
+    result = model._generate(state(), **TOOLS)
+    assert reasons(model) == [('strong', 'planning'), ('fast', 'routine'), ('strong', 'rejected')]
+    assert result.generations[0].message.tool_calls
+    assert model.strong.calls == 2
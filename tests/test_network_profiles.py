@@ -0,0 +1,47 @@
+import pytest
+
+from network_profiles import NetworkProfile, NetworkStats, build_network_profile
+
+def test_profiles_block_their_resource_types():
+    no_media = NetworkProfile('no-media')
+    assert no_media.should_block('https://example.com/a.png', 'image')
+    assert no_media.should_block('https://example.com/a.mp4', 'media')
+    assert not no_media.should_block('https://example.com/a.woff2', 'font')
+    assert not no_media.should_block('https://example.com/style.css', 'stylesheet')
+
+    text_only = NetworkProfile('text-only')
+    assert text_only.should_block('https://example.com/a.woff2', 'font')
+    assert not text_only.should_block('https://example.com/', 'document')
+
+def test_text_only_blocks_trackers():
+    profile = NetworkProfile('text-only')
+    assert profile.should_block('https://www.google-analytics.com/analytics.js', 'script')
+    assert profile.should_block('https://adservice.google.co.uk/ddm/fls/z', 'xhr')
+    assert not profile.should_block('https://www.google.com/search?q=x', 'document')
+    assert not NetworkProfile('no-media').should_block('https://www.google-analytics.com/analytics.js', 'script')
+
+def test_allow_wins_over_deny_and_resource_types():
+    profile = NetworkProfile('text-only', allow=['*://*.bbc.co.uk/*'], deny=['*://*.example-ads.com/*'])
+    assert not profile.should_block('https://ichef.bbc.co.uk/news/photo.jpg', 'image')
+    assert profile.should_block('https://cdn.example-ads.com/banner.js', 'script')
+    assert profile.should_block('https://example.com/photo.jpg', 'image')
+
+def test_full_profile_is_only_built_with_deny_patterns():
+    assert build_network_profile('full') is None
+    profile = build_network_profile('full', deny=['*://*.example-ads.com/*'])
+    assert profile.should_block('https://cdn.example-ads.com/banner.js', 'script')
+    assert not profile.should_block('https://example.com/photo.jpg', 'image')
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        NetworkProfile('images-only')
+
+def test_summary_lists_blocked_types():
+    stats = NetworkStats()
+    stats.requests_blocked = 3
+    stats.blocked_by_type.update({'image': 2, 'font': 1})
+    stats.bytes_saved_estimate = 120_000
+    stats.requests_allowed = 10
+    stats.bytes_downloaded = 2048
+    assert stats.summary() == ('Network: 3 request(s) blocked (image 2, font 1), ~117 KB saved (estimated), '
+                               '10 allowed, at least 2 KB downloaded')
@@ -0,0 +1,110 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+pytest.importorskip('aiohttp')
+pytest.importorskip('browser_use')
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import research_server
+from research_server import ResearchServer
+
+class FakePool:
+    def __init__(self):
+        self.leases = 0
+
+    @asynccontextmanager
+    async def lease(self):
+        self.leases += 1
+        yield f"lease-{self.leases}"
+
+@pytest.fixture
+def runs(monkeypatch):
+    calls = []
+
+    async def fake_run_research(prompt, **kwargs):
+        calls.append((prompt, kwargs))
+        if prompt == 'boom':
+            raise RuntimeError('browser crashed')
+        return f"result of {prompt}"
+
+    monkeypatch.setattr(research_server, 'run_research', fake_run_research)
+    return calls
+
+async def run_jobs(server: ResearchServer, *jobs):
+    submitted = [server.submit(prompt, options=options) for prompt, options in jobs]
+    server.start()
+    try:
+        while any(job.finished_at is None for job in submitted):
+            await asyncio.sleep(0.01)
+    finally:
+        await server.stop()
+    return submitted
+
+def test_worker_runs_jobs_on_the_pool_unless_they_need_their_own_browser(runs):
+    pool = FakePool()
+    server = ResearchServer(pool, workers=1, history_dir='History',
+                            browser_options={'headless': True, 'net_profile': 'no-media',
+                                             'extra_chromium_args': ['--disable-gpu']})
+
+    pooled, screencast, same_as_pool, dedicated = asyncio.run(run_jobs(
+        server,
+        ('pooled', {}),
+        ('screencast', {'screencast_port': 0}),
+        ('same', {'headless': True, 'net_profile': 'no-media'}),
+        ('dedicated', {'headless': False})
+    ))
+
+    assert [job.status for job in (pooled, screencast, same_as_pool, dedicated)] == ['done'] * 4
+    assert pooled.result == 'result of pooled'
+    assert pool.leases == 3
+    calls = dict(runs)
+    assert calls['pooled'] == {'lease': 'lease-1', 'history_dir': 'History', 'run_id': pooled.id,
+                               'screencast_port': None}
+    assert calls['screencast']['screencast_port'] == 0
+    assert calls['same']['lease'] == 'lease-3'
+    assert 'lease' not in calls['dedicated']
+    assert calls['dedicated']['headless'] is False
+    assert calls['dedicated']['net_profile'] == 'no-media'
+    assert calls['dedicated']['extra_chromium_args'] == ['--disable-gpu']
+
+def test_failed_job_records_its_error(runs):
+    server = ResearchServer(FakePool(), workers=1)
+    failed, ok = asyncio.run(run_jobs(server, ('boom', {}), ('fine', {})))
+    assert failed.status == 'failed'
+    assert failed.error == 'browser crashed'
+    assert ok.status == 'done'
+    assert server.running == 0
+
+def test_needs_dedicated_browser_compares_with_the_pool_settings():
+    server = ResearchServer(FakePool(), browser_options={'headless': False})
+    assert not server.needs_dedicated_browser({})
+    assert not server.needs_dedicated_browser({'headless': False, 'stealth_mode': True, 'screencast_port': 9000})
+    assert server.needs_dedicated_browser({'headless': True})
+    assert server.needs_dedicated_browser({'net_profile': 'text-only'})
+
+@pytest.mark.parametrize('body, content_type, status', [
+    ('{"prompt": "Research X"}', 'application/json', 202),
+    ('{"prompt": "Research X"}', 'text/plain', 415),
+    ('not json', 'application/json', 400),
+    ('["Research X"]', 'application/json', 400),
+    ('{"prompt": ""}', 'application/json', 400),
+    ('{"prompt": ["Research X"]}', 'application/json', 400),
+    ('{"prompt": "Research X", "priority": "high"}', 'application/json', 400),
+    ('{"prompt": "Research X", "options": {"chrome_path": "/bin/sh"}}', 'application/json', 400),
+    ('{"prompt": "Research X", "options": {"headless": "yes"}}', 'application/json', 400),
+    ('{"prompt": "Research X", "options": {"screencast_port": 70000}}', 'application/json', 400),
+    ('{"prompt": "Research X", "options": []}', 'application/json', 400),
+])
+def test_submit_validates_the_request(body, content_type, status):
+    async def scenario():
+        server = ResearchServer(FakePool())
+        async with TestClient(TestServer(server.make_app())) as client:
+            response = await client.post('/jobs', data=body, headers={'Content-Type': content_type})
+            return response.status, server.queue.qsize()
+
+    response_status, queued = asyncio.run(scenario())
+    assert response_status == status
+    assert queued == (1 if status == 202 else 0)
@@ -0,0 +1,73 @@
+import asyncio
+import base64
+import struct
+
+from screencast import ScreencastPublisher
+
+class FakeCDPSession:
+    def __init__(self):
+        self.handlers = {}
+        self.sent = []
+        self.detached = False
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def send(self, method, params=None):
+        self.sent.append(method)
+
+    async def detach(self):
+        self.detached = True
+
+    def emit_frame(self, data: bytes, session_id: int):
+        self.handlers['Page.screencastFrame']({'data': base64.b64encode(data).decode(), 'sessionId': session_id})
+
+class FakePage:
+    def __init__(self):
+        self.context = self
+        self.cdp = FakeCDPSession()
+
+    async def new_cdp_session(self, page):
+        return self.cdp
+
+class FakeBrowserContext:
+    def __init__(self, page):
+        self.session = object()
+        self.page = page
+
+    async def get_current_page(self):
+        return self.page
+
+async def wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError('condition not reached')
+
+def test_frames_reach_clients_and_close_detaches_the_page():
+    async def scenario():
+        page = FakePage()
+        publisher = ScreencastPublisher()
+        await publisher.start()
+        publisher.follow(FakeBrowserContext(page))
+        reader, writer = await asyncio.open_connection(publisher.host, publisher.port)
+        await wait_for(lambda: 'Page.startScreencast' in page.cdp.sent)
+
+        page.cdp.emit_frame(b'frame-1', 1)
+        page.cdp.emit_frame(b'frame-1', 2)
+        length, = struct.unpack('>I', await reader.readexactly(4))
+        assert await reader.readexactly(length) == b'frame-1'
+        await wait_for(lambda: page.cdp.sent.count('Page.screencastFrameAck') == 2)
+        assert (publisher.frames, publisher.duplicates) == (1, 1)
+
+        follow_task = publisher._follow_task
+        await publisher.close()
+        assert follow_task.done()
+        assert not publisher._tasks
+        assert page.cdp.detached
+        assert page.cdp.sent[-1] == 'Page.stopScreencast'
+        assert await reader.read() == b''
+        writer.close()
+
+    asyncio.run(scenario())
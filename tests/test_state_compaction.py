@@ -0,0 +1,124 @@
+import asyncio
+from typing import List
+
+import pytest
+
+pytest.importorskip('langchain_core')
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import SystemMessage
+
+from state_compaction import CompactingChatModel
+
+ARTICLE = '\n'.join([
+    '[1]<a href="/">Home</a>',
+    '[2]<a href="/news">News</a>',
+    'Researchers found that the new method halves the cost of long runs.',
+    '[3]<button aria-label="Read more">Read more</button>',
+    'The results were confirmed on three further data sets.',
+    '[4]<a href="/next">Next article</a>'
+])
+
+def compacting(**kwargs) -> CompactingChatModel:
+    return CompactingChatModel(inner=FakeListChatModel(responses=['ok']), **kwargs)
+
+def test_first_state_is_sent_in_full():
+    text, mode, collapsed = compacting()._compact_elements('https://example.com/a', ARTICLE)
+    assert mode == 'full'
+    assert collapsed == 0
+    assert text == ARTICLE
+
+def test_diff_keeps_page_text_and_shortens_unchanged_elements():
+    model = compacting()
+    model._compact_elements('https://example.com/a', ARTICLE)
+    text, mode, _ = model._compact_elements('https://example.com/a', ARTICLE + '\n[5]<input type="text" name="q">')
+
+    assert mode == 'diff'
+    # The previous state is not in the conversation any more, so its text must stay
+    assert 'Researchers found that the new method halves the cost of long runs.' in text
+    assert 'The results were confirmed on three further data sets.' in text
+    assert 'omitted' not in text
+    assert '[3]Read more' in text
+    assert '<button' not in text
+    assert '[5]<input type="text" name="q">' in text
+
+def test_mostly_changed_state_is_sent_in_full():
+    model = compacting()
+    model._compact_elements('https://example.com/a', ARTICLE)
+    changed = '\n'.join(f'[{i}]<a href="/item/{i}">Item {i}</a>' for i in range(10, 20))
+    text, mode, _ = model._compact_elements('https://example.com/a', changed)
+    assert mode == 'full'
+    assert text == changed
+
+def test_elements_repeated_on_other_pages_are_collapsed():
+    model = compacting()
+    nav = '[1]<a href="/">Home</a>\n[2]<a href="/news">News</a>'
+    model._compact_elements('https://example.com/a', nav + '\n[3]<a href="/x">First</a>')
+    model._compact_elements('https://example.com/b', nav + '\n[3]<a href="/y">Second</a>')
+    text, mode, collapsed = model._compact_elements('https://example.com/c', nav + '\nBody text\n[3]<a href="/z">Third</a>')
+
+    assert mode == 'full'
+    assert collapsed == 2
+    assert text.splitlines()[0] == 'Repeated site navigation and footer: [1]Home [2]News'
+    assert 'Body text' in text
+    assert '[3]<a href="/z">Third</a>' in text
+
+def test_long_state_is_cut_at_max_chars():
+    model = compacting(max_chars=200)
+    block = '\n'.join(f'[{i}]<a href="/item/{i}">Item number {i}</a>' for i in range(50))
+    text, _, _ = model._compact_elements('https://example.com/a', block)
+    kept, note = text.rsplit('\n', 1)
+    assert len(kept) <= 200
+    kept_lines = kept.count('\n') + 1
+    assert note == f"... {50 - kept_lines} more line(s) cut; scroll down to see them"
+
+class RecordingChatModel(FakeListChatModel):
+    received: List[list] = []
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.received.append(messages)
+        return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+class ElementTree:
+    def __init__(self, elements: str):
+        self.elements = elements
+
+    def clickable_elements_to_string(self, include_attributes=None):
+        return self.elements
+
+def state_message(elements: str, step: int, result: str = None):
+    """
+    A state message as browser_use builds it for the model.
+    """
+    pytest.importorskip('browser_use')
+    from browser_use.agent.prompts import AgentMessagePrompt
+    from browser_use.agent.views import ActionResult, AgentStepInfo
+    from browser_use.browser.views import BrowserState
+
+    state = BrowserState(element_tree=ElementTree(elements), selector_map={}, url='https://example.com/a',
+                         title='Example', tabs=[], screenshot='iVBORw0KGgo')
+    results = [ActionResult(extracted_content=result)] if result else None
+    return AgentMessagePrompt(state, results, step_info=AgentStepInfo(step_number=step, max_steps=10)).get_user_message()
+
+def test_agenerate_compacts_browser_use_state_messages():
+    inner = RecordingChatModel(responses=['ok', 'ok'])
+    model = CompactingChatModel(inner=inner)
+    system = SystemMessage(content='You are a browser agent.')
+
+    asyncio.run(model.ainvoke([system, state_message(ARTICLE, 0)]))
+    second = state_message(ARTICLE + '\n[5]<input type="text" name="q">', 1, result='Scrolled down')
+    asyncio.run(model.ainvoke([system, second]))
+
+    assert [call['mode'] for call in model.calls] == ['full', 'diff']
+    sent = inner.received[1][-1]
+    text = sent.content[0]['text']
+    original = second.content[0]['text']
+    # Only the element list between the two markers changes
+    assert text.split('Interactive elements from')[0] == original.split('Interactive elements from')[0]
+    assert text[text.index('\nCurrent step: 2/10'):] == original[original.index('\nCurrent step: 2/10'):]
+    assert 'Action result 1/1: Scrolled down' in text
+    assert '[3]Read more' in text
+    assert '<button' not in text
+    assert '[5]<input type="text" name="q">' in text
+    assert 'Researchers found that the new method halves the cost of long runs.' in text
+    assert sent.content[1] == second.content[1]